@@ -0,0 +1,71 @@
+from flask import Blueprint, request, jsonify
+from src.models.marketplace import Marketplace
+from src.models.routine import Routine
+from src.models.user import User
+from src.estimate_analytics import COMPLETIONS, DIMENSIONS, estimate_accuracy, numpy
+from src.table_versions import conditional
+from src.response_cache import response_cache
+from datetime import datetime, timedelta
+
+analytics_bp = Blueprint('analytics', __name__)
+
+def group_names(group_by, keys):
+    """Display names for the group keys, in one query"""
+    keys = [key for key in keys if key is not None]
+    if not keys:
+        return {}
+    if group_by == 'routine':
+        rows = Routine.query.with_entities(Routine.id, Routine.name).filter(Routine.id.in_(keys))
+    elif group_by == 'marketplace':
+        rows = Marketplace.query.with_entities(Marketplace.id, Marketplace.name).filter(Marketplace.id.in_(keys))
+    else:
+        rows = User.query.with_entities(User.id, User.name).filter(User.id.in_(keys))
+    return dict(rows.all())
+
+@analytics_bp.route('/analytics/estimates', methods=['GET'])
+@conditional(COMPLETIONS, bucket=300)
+@response_cache.cached(COMPLETIONS, ttl=300)
+def get_estimate_accuracy():
+    """Estimated vs actual task time (completed_at - started_at) per routine, marketplace or assignee"""
+    try:
+        if numpy is None:
+            return jsonify({
+                'success': False,
+                'error': 'Análise indisponível (numpy não instalado)'
+            }), 400
+        
+        group_by = request.args.get('groupBy', 'routine')
+        if group_by not in DIMENSIONS:
+            return jsonify({
+                'success': False,
+                'error': f'groupBy inválido (use {", ".join(DIMENSIONS)})'
+            }), 400
+        
+        try:
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from') else None
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('to') else None
+            min_samples = int(request.args.get('minSamples', 5))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetros inválidos (datas no formato AAAA-MM-DD, minSamples inteiro)'
+            }), 400
+        
+        result = estimate_accuracy(group_by, start, end, min_samples)
+        names = group_names(group_by, [group['key'] for group in result['groups']])
+        for group in result['groups']:
+            group['name'] = names.get(group['key'])
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'groupBy': group_by,
+                **result
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
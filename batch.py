@@ -0,0 +1,112 @@
+from flask import Blueprint, current_app, g, request, jsonify
+from werkzeug.exceptions import HTTPException
+from src.models.user import db
+
+batch_bp = Blueprint('batch', __name__)
+
+MAX_BATCH_SIZE = 20
+
+# flask.g entries carried from one sub-request to the next (token_required's verified
+# token and user id; never ORM objects, which belong to the previous sub-request's session)
+SHARED_G_KEYS = ('auth_token', 'auth_user_id')
+
+def run_subrequest(path, headers, shared):
+    """Dispatch an internal GET as a full request in its own app context.
+    
+    full_dispatch_request runs the before/after_request hooks, so every
+    sub-request gets its own query budget, metrics and error handling, and
+    the fresh app context gives it its own flask.g and database session. A
+    failed sub-request therefore cannot leave a broken session to the next
+    one; only the `shared` g entries (the verified token and user id) carry over.
+    """
+    with current_app.app_context(), current_app.test_request_context(path, method='GET', headers=headers):
+        for key, value in shared.items():
+            setattr(g, key, value)
+        
+        # Only API blueprints are reachable, not the SPA catch-all
+        if request.routing_exception is not None or request.blueprint is None:
+            return 404, {
+                'success': False,
+                'error': 'Endpoint não encontrado'
+            }
+        
+        try:
+            response = current_app.full_dispatch_request()
+        except HTTPException as e:
+            db.session.rollback()
+            return e.code, {'success': False, 'error': e.description}
+        except Exception:
+            db.session.rollback()
+            return 500, {'success': False, 'error': 'Erro interno do servidor'}
+        
+        for key in SHARED_G_KEYS:
+            if key in g:
+                shared[key] = g.get(key)
+        
+        if response.status_code >= 500:
+            db.session.rollback()
+        
+        if response.is_streamed:
+            response.close()
+            return 400, {
+                'success': False,
+                'error': 'Endpoint de streaming não suportado em lote'
+            }
+        
+        return response.status_code, response.get_json(silent=True)
+
+@batch_bp.route('/batch', methods=['POST'])
+def batch():
+    """Run several GET requests in one round trip"""
+    try:
+        data = request.get_json() or {}
+        subrequests = data.get('requests')
+        
+        if not isinstance(subrequests, list) or not subrequests:
+            return jsonify({
+                'success': False,
+                'error': 'Lista de requisições é obrigatória'
+            }), 400
+        
+        if len(subrequests) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Máximo de {MAX_BATCH_SIZE} requisições por lote'
+            }), 400
+        
+        headers = {}
+        if request.headers.get('Authorization'):
+            headers['Authorization'] = request.headers['Authorization']
+        
+        shared = {}
+        results = []
+        for index, subrequest in enumerate(subrequests):
+            if isinstance(subrequest, str):
+                subrequest = {'path': subrequest}
+            
+            path = subrequest.get('path') or ''
+            if not path.startswith('/api/'):
+                status, body = 400, {
+                    'success': False,
+                    'error': 'Caminho deve começar com /api/'
+                }
+            else:
+                status, body = run_subrequest(path, headers, shared)
+            
+            results.append({
+                'id': subrequest.get('id', index),
+                'path': path,
+                'status': status,
+                'body': body
+            })
+        
+        return jsonify({
+            'success': True,
+            'data': results
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,179 @@
+"""Load benchmark of the API endpoints against a seeded database.
+
+Usage: DATABASE_URL=sqlite:////abs/path/bench.db python -m src.bench_endpoints
+           [--mode client|wsgi|both] [--requests 200] [--concurrency 4] [--no-cache] [--output report.json]
+
+Seed the database first with python -m src.seed. Each endpoint is driven
+through the Flask test client and/or a real threaded WSGI server, and the
+report (p50/p95/p99 latency, throughput, peak RSS) is printed as JSON.
+"""
+import argparse
+import http.client
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from werkzeug.serving import make_server
+
+BENCH_USERNAME = 'bench-user-0'
+BENCH_PASSWORD = 'benchmark'
+
+
+def default_endpoints():
+    since = datetime.utcnow() - timedelta(hours=1)
+    since_token = format(int((since - datetime(1970, 1, 1)).total_seconds() * 1000000), 'x')
+    return [
+        ('auth_me', '/api/auth/me'),
+        ('dashboard', '/api/dashboard'),
+        ('tasks_today', '/api/tasks?date=today'),
+        ('tasks_today_sparse', '/api/tasks?date=today&fields=id,title,status,dueDate'),
+        ('tasks_marketplace_week', '/api/tasks?marketplace=bench-marketplace-0&date=week'),
+        ('tasks_daily', '/api/tasks/daily'),
+        ('tasks_stats', '/api/tasks/stats'),
+        ('routines', '/api/routines?marketplace=bench-marketplace-0'),
+        ('routines_stats', '/api/routines/stats'),
+        ('marketplaces', '/api/marketplaces'),
+        ('marketplaces_picker', '/api/marketplaces?fields=id,name,color'),
+        ('sync_delta', f'/api/sync?since={since_token}'),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+def bench_client(app, path, headers, requests, warmup):
+    client = app.test_client()
+    for _ in range(warmup):
+        client.get(path, headers=headers)
+
+    latencies, statuses = [], []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = client.get(path, headers=headers)
+        response.get_data()
+        latencies.append(time.perf_counter() - t0)
+        statuses.append(response.status_code)
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def bench_wsgi(port, path, headers, requests, warmup, concurrency):
+    local = threading.local()
+
+    def fetch():
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        t0 = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return time.perf_counter() - t0, response.status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fetch(), range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(lambda _: fetch(), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return summarize([latency for latency, _ in results], [status for _, status in results], elapsed)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('client', 'wsgi', 'both'), default='both')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--no-cache', action='store_true', help='Disable the response cache')
+    parser.add_argument('--only', help='Comma-separated endpoint names to run')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    # A sweeper thread writing mid-run would skew the timings; sweep once up front instead
+    os.environ['OVERDUE_SWEEP_INTERVAL'] = '0'
+    from src.main import app
+    from src.overdue_sweeper import SWEEP_INTERVAL, sweep
+
+    with app.app_context():
+        sweep()
+    # Reads then filter on the flag as in production
+    app.config['OVERDUE_SWEEP_INTERVAL'] = SWEEP_INTERVAL
+    app.config['RESPONSE_CACHE_ENABLED'] = not args.no_cache
+
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    headers = {}
+    if login.status_code == 200:
+        headers['Authorization'] = f"Bearer {login.get_json()['data']['token']}"
+
+    endpoints = default_endpoints()
+    if args.only:
+        wanted = set(args.only.split(','))
+        endpoints = [endpoint for endpoint in endpoints if endpoint[0] in wanted]
+
+    server = None
+    if args.mode in ('wsgi', 'both'):
+        server = make_server('127.0.0.1', args.port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    report = {
+        'startedAt': datetime.utcnow().isoformat(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'requestsPerEndpoint': args.requests,
+        'concurrency': args.concurrency,
+        'cache': not args.no_cache,
+        'endpoints': {},
+    }
+
+    try:
+        for name, path in endpoints:
+            result = {'path': path}
+            if args.mode in ('client', 'both'):
+                result['client'] = bench_client(app, path, headers, args.requests, args.warmup)
+            if server is not None:
+                result['wsgi'] = bench_wsgi(args.port, path, headers, args.requests, args.warmup, args.concurrency)
+            report['endpoints'][name] = result
+            print(f'{name}: done', file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report['peakRssMb'] = peak_rss_mb()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Micro-benchmark: Task.to_dict() + stdlib json vs. column rows + RowSerializer + fast provider.
+
+Usage: python -m src.bench_serialization [--tasks 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from src.json_provider import FastJSONProvider
+from src.models.marketplace import Marketplace
+from src.models.task import Task, db
+from src.serializers import task_serializer
+
+
+def build_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.json = FastJSONProvider(app)
+    db.init_app(app)
+    return app
+
+
+def seed(count):
+    db.session.add(Marketplace(id='bench', name='Bench', type='ecommerce', tags='[]', custom_fields='[]'))
+    now = datetime.utcnow()
+    db.session.bulk_insert_mappings(Task, [
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'Tarefa {i}',
+            'description': 'Verificar pedidos atrasados e responder perguntas',
+            'status': ('todo', 'in-progress', 'completed')[i % 3],
+            'priority': 'medium',
+            'category': 'Monitoramento',
+            'marketplace_id': 'bench',
+            'due_date': now + timedelta(hours=i % 48),
+            'estimated_time': 15,
+            'links': json.dumps(['https://seller.example.com/orders']),
+            'created_at': now,
+            'updated_at': now,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+
+def orm_path():
+    tasks = Task.query.order_by(Task.due_date.asc()).all()
+    return len(json.dumps({'success': True, 'data': [task.to_dict() for task in tasks]}))
+
+
+def row_path(app):
+    def run():
+        rows = Task.query.with_entities(*task_serializer.columns()).order_by(Task.due_date.asc()).all()
+        return len(app.json.dumps({'success': True, 'data': task_serializer.serialize(rows)}))
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = build_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.tasks)
+
+        orm_time, orm_size = best_of(args.repeat, orm_path)
+        row_time, row_size = best_of(args.repeat, row_path(app))
+
+    print(json.dumps({
+        'tasks': args.tasks,
+        'to_dict_stdlib': {'seconds': round(orm_time, 4), 'bytes': orm_size},
+        'row_serializer_fast': {'seconds': round(row_time, 4), 'bytes': row_size},
+        'speedup': round(orm_time / row_time, 2) if row_time else None
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""Stream CSV or NDJSON files of tasks or marketplaces into batched bulk inserts.
+
+Usage: python -m src.bulk_import --database app.db --kind tasks tarefas.csv [--format csv|ndjson]
+"""
+import argparse
+import csv
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from src.json_provider import loads
+from src.models.marketplace import Marketplace
+from src.models.routine import Routine
+from src.models.task import Task, db
+from src.models.task_event import TaskEvent
+from src.models.user import User
+from src import overdue_sweeper  # imported so the tasks table has the overdue columns the rows fill in
+from src import table_versions
+
+BATCH_SIZE = 1000
+
+# The report keeps at most this many row errors (the failed count is always exact)
+MAX_ERRORS = 500
+
+# Error for the line holding bytes that are not UTF-8; reading stops there
+UNDECODABLE = 'Arquivo deve estar em UTF-8; importação interrompida nesta linha'
+
+FORMATS = ('csv', 'ndjson')
+TASK_STATUSES = ('todo', 'in-progress', 'completed')
+TRUE_VALUES = ('1', 'true', 'sim', 'yes', 'y')
+
+# Event recorded after CREATED for tasks imported already past todo
+STATUS_EVENTS = {'in-progress': TaskEvent.STARTED, 'completed': TaskEvent.COMPLETED}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class RowError(ValueError):
+    """A record that cannot be imported; the message goes into the report"""
+
+
+def detect_format(requested=None, mimetype=None, filename=None):
+    """csv or ndjson from an explicit choice, the upload's content type or its extension"""
+    if requested:
+        return requested.lower() if requested.lower() in FORMATS else None
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension == 'csv':
+            return 'csv'
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+    return None
+
+
+class DecodedLines:
+    """Decodes a binary stream one line at a time, remembering the physical line last read"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.line = 0
+
+    def __iter__(self):
+        encoding = 'utf-8-sig'
+        for raw in self.stream:
+            self.line += 1
+            yield raw.decode(encoding)
+            encoding = 'utf-8'
+
+
+def iter_records(stream, fmt):
+    """Yield (line, record, error) from a binary stream, one record at a time.
+
+    Undecodable bytes end the stream with an UNDECODABLE error at their line."""
+    text_stream = DecodedLines(stream)
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text_stream)
+            for record in reader:
+                # Empty cells mean "not given", like a missing JSON key
+                yield reader.line_num, {
+                    key.strip(): value for key, value in record.items() if key and value not in (None, '')
+                }, None
+            return
+
+        for raw in text_stream:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                record = loads(raw)
+            except ValueError:
+                yield text_stream.line, None, 'JSON inválido'
+                continue
+            if not isinstance(record, dict):
+                yield text_stream.line, None, 'Cada linha deve ser um objeto JSON'
+                continue
+            yield text_stream.line, record, None
+    except UnicodeDecodeError:
+        yield text_stream.line, None, UNDECODABLE
+
+
+def _text(record, key):
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _int(record, key):
+    value = record.get(key)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key} inválido')
+
+
+def _bool(record, key, default):
+    value = record.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _datetime(record, key):
+    value = record.get(key)
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise RowError(f'{key} inválido')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _json_list(record, key):
+    """A JSON array column from a list, a JSON array string or 'a|b|c'"""
+    value = record.get(key)
+    if value in (None, ''):
+        return '[]'
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            try:
+                value = loads(value)
+            except ValueError:
+                raise RowError(f'{key} inválido')
+        else:
+            value = [item.strip() for item in value.split('|') if item.strip()]
+    if not isinstance(value, list):
+        raise RowError(f'{key} inválido')
+    return json.dumps(value)
+
+
+class TaskImporter:
+    """Turns task records (the POST /tasks payload shape) into tasks table rows"""
+
+    table = Task.__table__
+    label = 'tarefas importadas'
+
+    def __init__(self):
+        # Reference tables are small; one query each replaces a lookup per row
+        self.marketplace_ids = set(db.session.execute(select(Marketplace.id)).scalars())
+        self.user_ids = set(db.session.execute(select(User.id)).scalars())
+        self.routine_ids = set(db.session.execute(select(Routine.id)).scalars())
+
+    def convert(self, record, now):
+        title = _text(record, 'title')
+        if not title:
+            raise RowError('Título é obrigatório')
+
+        marketplace_id = _text(record, 'marketplace')
+        if not marketplace_id:
+            raise RowError('Marketplace é obrigatório')
+        if marketplace_id not in self.marketplace_ids:
+            raise RowError('Marketplace não encontrado')
+
+        assignee_id = _int(record, 'assigneeId')
+        if assignee_id is not None and assignee_id not in self.user_ids:
+            raise RowError('Usuário responsável não encontrado')
+
+        routine_id = _int(record, 'routineId')
+        if routine_id is not None and routine_id not in self.routine_ids:
+            raise RowError('Rotina não encontrada')
+
+        status = _text(record, 'status') or 'todo'
+        if status not in TASK_STATUSES:
+            raise RowError('Status inválido')
+
+        due_date = _datetime(record, 'dueDate')
+        is_overdue = due_date is not None and due_date < now and status != 'completed'
+
+        return {
+            'id': _text(record, 'id') or str(uuid.uuid4()),
+            'title': title,
+            'description': _text(record, 'description'),
+            'status': status,
+            'priority': _text(record, 'priority') or 'medium',
+            'category': _text(record, 'category'),
+            'marketplace_id': marketplace_id,
+            'routine_id': routine_id,
+            'assignee_id': assignee_id,
+            'due_date': due_date,
+            'estimated_time': _int(record, 'estimatedTime'),
+            'links': _json_list(record, 'links'),
+            'notes': _text(record, 'notes'),
+            'started_at': now if status == 'in-progress' else None,
+            'completed_at': now if status == 'completed' else None,
+            'created_at': now,
+            'updated_at': now,
+            # Flagged up front so imported tasks do not wait for the next overdue sweep
+            'overdue': is_overdue,
+            'overdue_at': now if is_overdue else None,
+        }
+
+    def events(self, rows):
+        """task_events rows for imported tasks: CREATED, then the event that led to their status"""
+        events = []
+        for row in rows:
+            ts = int((row['created_at'] - EPOCH).total_seconds() * 1000)
+            events.append({'task_id': row['id'], 'event_type': TaskEvent.CREATED, 'ts': ts})
+            if row['status'] in STATUS_EVENTS:
+                # One millisecond later, so the event log orders the two
+                events.append({'task_id': row['id'], 'event_type': STATUS_EVENTS[row['status']], 'ts': ts + 1})
+        return events
+
+
+class MarketplaceImporter:
+    """Turns marketplace records (the POST /marketplaces payload shape) into marketplaces table rows"""
+
+    table = Marketplace.__table__
+    label = 'marketplaces importados'
+
+    def convert(self, record, now):
+        name = _text(record, 'name')
+        if not name:
+            raise RowError('Nome é obrigatório')
+
+        marketplace_type = _text(record, 'type')
+        if not marketplace_type:
+            raise RowError('Tipo é obrigatório')
+
+        # Nested objects from NDJSON, flat columns (adminUrl, scheduleStart...) from CSV
+        urls = record.get('urls') if isinstance(record.get('urls'), dict) else {}
+        schedule = record.get('schedule') if isinstance(record.get('schedule'), dict) else {}
+
+        return {
+            'id': _text(record, 'id') or str(uuid.uuid4()),
+            'name': name,
+            'description': _text(record, 'description'),
+            'color': _text(record, 'color'),
+            'logo_url': _text(record, 'logoUrl'),
+            'type': marketplace_type,
+            'priority': _text(record, 'priority') or 'medium',
+            'tags': _json_list(record, 'tags'),
+            'responsible': _text(record, 'responsible'),
+            'active': _bool(record, 'active', True),
+            'favorite': _bool(record, 'favorite', False),
+            'admin_url': _text(urls, 'admin') or _text(record, 'adminUrl'),
+            'reports_url': _text(urls, 'reports') or _text(record, 'reportsUrl'),
+            'other_url': _text(urls, 'other') or _text(record, 'otherUrl'),
+            'schedule_start': _text(schedule, 'start') or _text(record, 'scheduleStart'),
+            'schedule_end': _text(schedule, 'end') or _text(record, 'scheduleEnd'),
+            'timezone': _text(record, 'timezone') or 'America/Sao_Paulo',
+            'custom_fields': _json_list(record, 'customFields'),
+            'created_at': now,
+            'updated_at': now,
+        }
+
+    def events(self, rows):
+        """Marketplaces have no event log"""
+        return []
+
+
+IMPORTERS = {'tasks': TaskImporter, 'marketplaces': MarketplaceImporter}
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        # Line where reading stopped early (undecodable bytes), None when the whole file was read
+        self.stopped_at = None
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errorsTruncated': self.failed > len(self.errors),
+            'stoppedAtLine': self.stopped_at
+        }
+
+
+def _insert_events(importer, rows):
+    """Log the imported rows' events in the same transaction as the rows"""
+    events = importer.events(rows)
+    if events:
+        db.session.execute(TaskEvent.__table__.insert(), events)
+
+
+def _insert_batch(importer, batch, report):
+    """Insert one batch in a single executemany, skipping ids that already exist"""
+    table = importer.table
+    ids = [row['id'] for _line, row in batch]
+    existing = set(db.session.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+
+    rows, seen = [], set()
+    for line, row in batch:
+        if row['id'] in existing or row['id'] in seen:
+            report.error(line, 'ID já existe')
+            continue
+        seen.add(row['id'])
+        rows.append((line, row))
+    if not rows:
+        return
+
+    try:
+        db.session.execute(table.insert(), [row for _line, row in rows])
+        _insert_events(importer, [row for _line, row in rows])
+        db.session.commit()
+        report.imported += len(rows)
+        return
+    except Exception:
+        db.session.rollback()
+
+    # Something in the batch was rejected by the database; insert row by row to find it
+    for line, row in rows:
+        try:
+            db.session.execute(table.insert(), row)
+            _insert_events(importer, [row])
+            db.session.commit()
+            report.imported += 1
+        except Exception as e:
+            db.session.rollback()
+            report.error(line, str(getattr(e, 'orig', e)))
+
+
+def run_import(importer, records, batch_size=BATCH_SIZE):
+    """Validate and insert (line, record, error) tuples; only one batch is held in memory"""
+    report = ImportReport()
+    now = datetime.utcnow()
+    batch = []
+
+    for line, record, error in records:
+        report.total += 1
+        if error is None:
+            try:
+                batch.append((line, importer.convert(record, now)))
+            except RowError as e:
+                error = str(e)
+        if error is not None:
+            report.error(line, error)
+        if error == UNDECODABLE:
+            # Nothing past the bad bytes can be read; rows before them are still imported
+            # and reported, since earlier batches are already committed
+            report.stopped_at = line
+            break
+
+        if len(batch) >= batch_size:
+            _insert_batch(importer, batch, report)
+            batch = []
+
+    if batch:
+        _insert_batch(importer, batch, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='CSV or NDJSON file')
+    parser.add_argument('--database', required=True, help='SQLite file path or SQLAlchemy URI')
+    parser.add_argument('--kind', choices=sorted(IMPORTERS), required=True)
+    parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = detect_format(args.format, filename=args.path)
+    if fmt is None:
+        parser.error('cannot tell the format from the file name (use --format)')
+
+    from src.seed import build_app
+
+    # Invalidate the running workers' ETags and cached responses too
+    shared_path = os.environ.get('RESPONSE_CACHE_SHARED_PATH')
+    if shared_path:
+        from src.shared_store import SharedStore
+        table_versions.use_shared_store(SharedStore(shared_path))
+    table_versions.track_writes()
+
+    app = build_app(args.database)
+    with app.app_context(), open(args.path, 'rb') as stream:
+        report = run_import(IMPORTERS[args.kind](), iter_records(stream, fmt), args.batch_size)
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
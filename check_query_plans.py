@@ -0,0 +1,150 @@
+"""Query-plan regression check for the list and stats endpoints.
+
+Usage: python -m src.check_query_plans [--tasks 20000] [--threshold 1000]
+
+Seeds a temporary SQLite database, calls get_tasks (every filter
+combination), get_daily_tasks, get_task_stats, get_routines,
+get_routine_stats and get_marketplaces through the test client, captures
+the SQL each one runs and checks EXPLAIN QUERY PLAN for full table scans
+on tables larger than the threshold. In filtered scenarios walking a whole
+index counts as a full scan too: every listing orders by due_date, so a
+lost filter index would otherwise hide behind a scan of ix_tasks_due_date.
+Exits non-zero on any regression so it can gate CI.
+"""
+import argparse
+import itertools
+import os
+import re
+import sys
+import tempfile
+
+from sqlalchemy import event, text
+
+# "SCAN tasks" is a full table scan; "SCAN tasks USING [COVERING] INDEX ..." walks a whole index
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+)?$')
+
+
+def task_scenarios():
+    filters = {
+        'status': ('all', 'todo'),
+        'priority': ('all', 'high'),
+        'marketplace': ('all', 'bench-marketplace-0'),
+        'assignee': ('all', '1'),
+        'date': ('all', 'today', 'week', 'month', 'overdue'),
+    }
+    names = list(filters)
+    for values in itertools.product(*(filters[name] for name in names)):
+        query = '&'.join(f'{name}={value}' for name, value in zip(names, values) if value != 'all')
+        yield (f'/api/tasks?{query}', True) if query else ('/api/tasks', False)
+
+
+def scenarios():
+    """(path, filtered) pairs; filtered scenarios must SEARCH the tables they filter"""
+    yield from task_scenarios()
+    yield '/api/tasks/daily', True
+    yield '/api/tasks/stats', False
+    yield '/api/routines', False
+    yield '/api/routines?marketplace=bench-marketplace-0', True
+    yield '/api/routines?status=active', True
+    yield '/api/routines/stats', False
+    yield '/api/marketplaces', False
+    yield '/api/marketplaces?favorites=true', True
+
+
+def seed(database, tasks):
+    from src.models.user import db
+    from src.seed import build_app, seed_database
+    from src.schema import ensure_schema
+    from src.overdue_sweeper import sweep
+
+    app = build_app(database)
+    with app.app_context():
+        db.create_all()
+        ensure_schema(db)
+        seed_database(marketplaces=50, routines=max(tasks // 20, 10), tasks=tasks, users=50, log=lambda message: None)
+        # Flag overdue tasks before ANALYZE so the planner sees the flag's real distribution
+        sweep()
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+
+def full_scans(conn, statement, parameters, table_sizes, threshold, filtered):
+    """Plan steps reading all of a table above the threshold (whole-index walks too when filtered)"""
+    plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    found = []
+    for row in plan:
+        match = FULL_SCAN_RE.match(row[-1])
+        if match and table_sizes.get(match.group(1), 0) > threshold and (filtered or not match.group(2)):
+            found.append(row[-1])
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=20000, help='Tasks to seed')
+    parser.add_argument('--threshold', type=int, default=1000, help='Tables with more rows must not be fully scanned')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='query-plans-')
+    database = os.path.join(workdir, 'plans.db')
+    seed(database, args.tasks)
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ['OVERDUE_SWEEP_INTERVAL'] = '0'
+    from src.main import app, db
+    from src.overdue_sweeper import SWEEP_INTERVAL
+
+    # No sweeper thread was started, but reads should filter on the flag (set by seed) as in production
+    app.config['OVERDUE_SWEEP_INTERVAL'] = SWEEP_INTERVAL
+
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    failures = []
+    checked = 0
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as conn:
+            table_sizes = {
+                table: conn.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+                for table in ('tasks', 'routines', 'routine_tasks', 'marketplaces', 'users')
+            }
+
+        client = app.test_client()
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            for path, filtered in scenarios():
+                captured.clear()
+                response = client.get(path)
+                if response.status_code != 200:
+                    failures.append((path, f'HTTP {response.status_code}', ''))
+                    continue
+
+                statements = list(captured)
+                with engine.connect() as conn:
+                    for statement, parameters in statements:
+                        checked += 1
+                        for scan in full_scans(conn, statement, parameters, table_sizes, args.threshold, filtered):
+                            failure = (path, scan, ' '.join(statement.split()))
+                            if failure not in failures:
+                                failures.append(failure)
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+    print(f'Checked {checked} statements; table sizes: {table_sizes}')
+    for path, problem, statement in failures:
+        print(f'FAIL {path}: {problem}\n     {statement[-300:]}')
+
+    if failures:
+        sys.exit(1)
+    print('OK: no full table scans above the threshold')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+from flask import current_app, request
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/',
+    'image/svg+xml',
+)
+
+
+# Compress appends the content coding to the ETag, so identity and encoded bodies never share a validator
+ENCODINGS = ('br', 'gzip')
+
+
+def encoded_etag(etag, encoding):
+    return f'{etag}-{encoding}'
+
+
+def base_etag(tag):
+    """The ETag a view set, given one that may carry an encoding suffix added by Compress"""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def matching_etag(etag, tags):
+    """The tag of an If-None-Match/If-Match header matching `etag` in any encoding, or None"""
+    if tags.star_tag:
+        return etag
+    for tag in tags.as_set(include_weak=True):
+        if base_etag(tag) == etag:
+            return tag
+    return None
+
+
+class Compress:
+    """Negotiate gzip/brotli response compression per request via Accept-Encoding"""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.after_request(self.after_request)
+
+    def choose_encoding(self):
+        """Pick the best supported encoding the client accepts, if any"""
+        supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+        best, best_quality = None, 0
+        for encoding in supported:
+            quality = request.accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def after_request(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        config = current_app.config
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding, config)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(data, quality=config['COMPRESS_BR_LEVEL']))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=config['COMPRESS_LEVEL']))
+
+        response.content_encoding = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, encoding, config):
+        """Compress a streamed body chunk by chunk, flushing so clients see each chunk promptly"""
+        try:
+            if encoding == 'br':
+                compressor = brotli.Compressor(quality=config['COMPRESS_BR_LEVEL'])
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    yield compressor.process(chunk) + compressor.flush()
+                yield compressor.finish()
+            else:
+                compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                yield compressor.flush()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
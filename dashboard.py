@@ -0,0 +1,174 @@
+from flask import Blueprint, jsonify
+from src.models.task import Task, db
+from src.models.routine import Routine
+from src.models.marketplace import Marketplace
+from src.table_versions import conditional
+from src.response_cache import response_cache
+from src.query_budget import query_budget
+from src.overdue_sweeper import overdue_condition
+from src.task_archive import ARCHIVE_TABLE, archive_counts
+from src.routine_occurrences import LOOKBACK, DUE_AFTER, virtual_tasks, enabled as virtual_routine_tasks
+from datetime import datetime, timedelta
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+NEXT_EXECUTIONS_LIMIT = 5
+
+def count_if(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@conditional('tasks', ARCHIVE_TABLE, 'routines', 'marketplaces', 'routine_tasks', 'tombstones', bucket=30)
+@response_cache.cached('tasks', ARCHIVE_TABLE, 'routines', 'marketplaces', 'routine_tasks', 'tombstones', ttl=30)
+@query_budget(7)  # one for the archive counts when not cached, two for virtual routine tasks when enabled
+def get_dashboard():
+    """Everything the dashboard shows, computed with a fixed number of grouped queries"""
+    try:
+        now = datetime.utcnow()
+        today_start = datetime.combine(now.date(), datetime.min.time())
+        today_end = datetime.combine(now.date(), datetime.max.time())
+        week_start = datetime.combine((now - timedelta(days=now.weekday())).date(), datetime.min.time())
+        week_end = week_start + timedelta(days=7)
+        
+        # 1. Task counts per status, with today's, overdue and routine-generated splits
+        is_today = Task.due_date.between(today_start, today_end)
+        task_rows = db.session.query(
+            Task.status,
+            db.func.count(Task.id),
+            count_if(is_today),
+            count_if(overdue_condition(now)),
+            count_if(Task.routine_id.isnot(None)),
+            db.func.coalesce(db.func.sum(db.case((is_today, Task.estimated_time), else_=0)), 0)
+        ).group_by(Task.status).all()
+        
+        status_counts = {}
+        today = {'total': 0, 'completed': 0, 'remainingTime': 0}
+        overdue = 0
+        routine_tasks = {'total': 0, 'completed': 0}
+        for status, total, today_count, overdue_count, routine_count, today_time in task_rows:
+            status_counts[status] = total
+            today['total'] += today_count
+            overdue += overdue_count
+            routine_tasks['total'] += routine_count
+            if status == 'completed':
+                today['completed'] += today_count
+                routine_tasks['completed'] += routine_count
+            else:
+                today['remainingTime'] += today_time or 0
+        
+        # Archived tasks are all completed and long past due, so they only add to the totals
+        archived, archived_routine_tasks = archive_counts()
+        if archived:
+            status_counts['completed'] = status_counts.get('completed', 0) + archived
+            routine_tasks['total'] += archived_routine_tasks
+            routine_tasks['completed'] += archived_routine_tasks
+        
+        # Virtual routine tasks (unassigned todos): one read covering both the
+        # ones already due to run and the ones due this week
+        weekly_virtual = {}
+        if virtual_routine_tasks():
+            for task in virtual_tasks(min(week_start, now - LOOKBACK), max(week_end, now + DUE_AFTER), now=now):
+                due_date = datetime.fromisoformat(task['dueDate'])
+                if week_start <= due_date < week_end:
+                    weekly_virtual[task['marketplace']] = weekly_virtual.get(task['marketplace'], 0) + 1
+                if due_date >= now + DUE_AFTER:
+                    continue
+                status_counts['todo'] = status_counts.get('todo', 0) + 1
+                routine_tasks['total'] += 1
+                overdue += due_date < now
+                if today_start <= due_date <= today_end:
+                    today['total'] += 1
+                    today['remainingTime'] += task['estimatedTime'] or 0
+        
+        total_tasks = sum(status_counts.values())
+        completed_tasks = status_counts.get('completed', 0)
+        
+        # 2. Routine stats in a single pass
+        routine_row = db.session.query(
+            db.func.count(Routine.id),
+            count_if(Routine.status == 'active'),
+            count_if(Routine.next_execution.between(today_start, today_end))
+        ).one()
+        
+        # 3. Weekly task counts for every marketplace (zero rows included)
+        week_rows = db.session.query(
+            Marketplace.id,
+            Marketplace.name,
+            Marketplace.color,
+            db.func.count(Task.id),
+            count_if(Task.status == 'completed')
+        ).outerjoin(
+            Task,
+            db.and_(Task.marketplace_id == Marketplace.id, Task.due_date >= week_start, Task.due_date < week_end)
+        ).group_by(Marketplace.id, Marketplace.name, Marketplace.color).order_by(Marketplace.name).all()
+        
+        # 4. Upcoming routine executions
+        next_rows = db.session.query(
+            Routine.id,
+            Routine.name,
+            Routine.next_execution,
+            Routine.estimated_time,
+            Marketplace.name,
+            Marketplace.color
+        ).outerjoin(
+            Marketplace, Marketplace.id == Routine.marketplace_id
+        ).filter(
+            Routine.status == 'active',
+            Routine.next_execution >= now
+        ).order_by(Routine.next_execution.asc()).limit(NEXT_EXECUTIONS_LIMIT).all()
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'tasks': {
+                    'total': total_tasks,
+                    'byStatus': status_counts,
+                    'pending': status_counts.get('todo', 0) + status_counts.get('in-progress', 0),
+                    'completed': completed_tasks,
+                    'overdue': overdue,
+                    'completionRate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
+                },
+                'today': {
+                    'total': today['total'],
+                    'completed': today['completed'],
+                    'progress': round((today['completed'] / today['total'] * 100) if today['total'] > 0 else 0, 1),
+                    'remainingTime': today['remainingTime']
+                },
+                'routines': {
+                    'totalRoutines': routine_row[0],
+                    'activeRoutines': routine_row[1],
+                    'todayExecutions': routine_row[2],
+                    'completionRate': round((routine_tasks['completed'] / routine_tasks['total'] * 100) if routine_tasks['total'] > 0 else 0, 1)
+                },
+                'marketplaces': [
+                    {
+                        'id': marketplace_id,
+                        'name': name,
+                        'color': color,
+                        'weeklyTasks': {
+                            'total': total + weekly_virtual.get(marketplace_id, 0),
+                            'completed': completed,
+                            'pending': total + weekly_virtual.get(marketplace_id, 0) - completed
+                        }
+                    }
+                    for marketplace_id, name, color, total, completed in week_rows
+                ],
+                'nextExecutions': [
+                    {
+                        'id': routine_id,
+                        'name': name,
+                        'nextExecution': next_execution,
+                        'estimatedTime': estimated_time,
+                        'marketplaceName': marketplace_name,
+                        'marketplaceColor': marketplace_color
+                    }
+                    for routine_id, name, next_execution, estimated_time, marketplace_name, marketplace_color in next_rows
+                ]
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
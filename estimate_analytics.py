@@ -0,0 +1,260 @@
+import threading
+import time
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:  # the analytics endpoint is unavailable without NumPy
+    numpy = None
+
+from sqlalchemy import select, union_all
+
+from src.models.task import Task, db
+from src.models.task_event import TaskEvent
+from src.task_archive import archived_tasks
+from src import table_versions
+
+# Pseudo-table bumped whenever a task is completed; the dataset reloads when it changes
+COMPLETIONS = 'task_completions'
+
+# Reload at least this often, so edits and deletes of completed tasks show up too
+DATASET_TTL = 300
+
+LOAD_BATCH_ROWS = 50000
+
+DIMENSIONS = {
+    'routine': 'routine_id',
+    'marketplace': 'marketplace_id',
+    'assignee': 'assignee_id',
+}
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Buckets of actual / estimated time for the error distribution
+RATIO_BINS = (0.5, 0.8, 1.2, 1.5, 2.0)
+RATIO_LABELS = ('<0.5', '0.5-0.8', '0.8-1.2', '1.2-1.5', '1.5-2', '>=2')
+
+SECONDS_PER_DAY = 86400.0
+
+
+class EstimateDataset:
+    """Columns of every completed task with a start time and an estimate, as NumPy arrays.
+
+    Group keys are stored as integer codes per dimension plus the list of
+    key values, so grouping is a bincount instead of a Python loop.
+    """
+
+    def __init__(self, estimated, actual, completed_days, codes, keys):
+        self.estimated = estimated
+        self.actual = actual
+        self.completed_days = completed_days
+        self.codes = codes
+        self.keys = keys
+
+    @classmethod
+    def load(cls):
+        columns = [
+            'id', 'estimated_time', 'started_at', 'completed_at',
+            *DIMENSIONS.values()
+        ]
+
+        def source(t):
+            return select(*[getattr(t, name) for name in columns]).where(
+                t.status == 'completed',
+                t.started_at.isnot(None),
+                t.completed_at.isnot(None),
+                t.estimated_time > 0
+            )
+
+        done = union_all(source(Task), source(archived_tasks.c)).subquery()
+        worked = worked_time().subquery()
+        statement = select(
+            *[done.c[name] for name in columns[1:]], worked.c.worked_ms
+        ).outerjoin_from(done, worked, worked.c.task_id == done.c.id)
+        result = db.session.execute(statement.execution_options(yield_per=LOAD_BATCH_ROWS))
+
+        # Each batch is transposed once and converted column by column
+        chunks = {name: [] for name in ('estimated', 'started', 'completed', 'worked')}
+        codes = {dimension: [] for dimension in DIMENSIONS}
+        lookups = {dimension: {} for dimension in DIMENSIONS}
+        for rows in result.partitions():
+            estimated, started, completed, *keys, worked_ms = zip(*rows)
+            chunks['estimated'].append(numpy.array(estimated, dtype=numpy.float64))
+            chunks['started'].append(numpy.array(started, dtype='datetime64[us]'))
+            chunks['completed'].append(numpy.array(completed, dtype='datetime64[us]'))
+            chunks['worked'].append(numpy.array(worked_ms, dtype=numpy.float64))  # None -> NaN
+            for dimension, values in zip(DIMENSIONS, keys):
+                lookup = lookups[dimension]
+                for key in dict.fromkeys(values):
+                    lookup.setdefault(key, len(lookup))
+                codes[dimension].append(
+                    numpy.fromiter(map(lookup.__getitem__, values), dtype=numpy.int64, count=len(values))
+                )
+
+        def column(name, dtype):
+            return numpy.concatenate(chunks[name]) if chunks[name] else numpy.array([], dtype=dtype)
+
+        started = column('started', 'datetime64[us]')
+        completed = column('completed', 'datetime64[us]')
+        worked = column('worked', numpy.float64)
+        epoch = numpy.datetime64('1970-01-01T00:00:00', 'us')
+        return cls(
+            estimated=column('estimated', numpy.float64),
+            # Time spent in progress per the event log; tasks without events fall back to
+            # the last start, which undercounts work done before a pause
+            actual=numpy.where(
+                numpy.isnan(worked),
+                (completed - started) / numpy.timedelta64(1, 'm'),
+                worked / 60000.0
+            ),
+            completed_days=(completed - epoch) / numpy.timedelta64(1, 's') / SECONDS_PER_DAY,
+            codes={
+                dimension: numpy.concatenate(values) if values else numpy.array([], dtype=numpy.int64)
+                for dimension, values in codes.items()
+            },
+            keys={dimension: list(lookup) for dimension, lookup in lookups.items()}
+        )
+
+
+def worked_time():
+    """Milliseconds each task spent in progress: every STARTED event until the task's next event"""
+    events = TaskEvent.__table__
+    intervals = select(
+        events.c.task_id,
+        events.c.event_type,
+        events.c.ts,
+        db.func.lead(events.c.ts).over(partition_by=events.c.task_id, order_by=events.c.ts).label('next_ts')
+    ).subquery()
+    return select(
+        intervals.c.task_id,
+        db.func.sum(intervals.c.next_ts - intervals.c.ts).label('worked_ms')
+    ).where(
+        intervals.c.event_type == TaskEvent.STARTED,
+        intervals.c.next_ts.isnot(None)
+    ).group_by(intervals.c.task_id)
+
+
+_dataset = None
+_lock = threading.Lock()
+
+
+def dataset():
+    """The cached dataset, reloaded after completions or every DATASET_TTL seconds"""
+    global _dataset
+    version = table_versions.current(COMPLETIONS)
+    with _lock:
+        if _dataset is None or _dataset[0] != version or time.time() - _dataset[1] > DATASET_TTL:
+            _dataset = (version, time.time(), EstimateDataset.load())
+        return _dataset[2]
+
+
+def grouped_stats(codes, group_count, estimated, actual, completed_days):
+    """Error statistics for every group at once, as one array per statistic"""
+    counts = numpy.bincount(codes, minlength=group_count)
+    present = counts > 0
+    safe_counts = numpy.where(present, counts, 1)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+
+    error = actual - estimated
+    ratio = actual / estimated
+
+    def mean(values):
+        sums = numpy.bincount(codes, weights=values, minlength=group_count)
+        return numpy.where(present, sums / safe_counts, numpy.nan)
+
+    def percentiles(values):
+        # Sort by (group, value) once, then interpolate inside each group's slice
+        ordered = values[numpy.lexsort((values, codes))]
+        result = {}
+        for q in PERCENTILES:
+            position = starts + (q / 100.0) * (safe_counts - 1)
+            # Empty groups point past the end; their result is masked out below
+            lower = numpy.minimum(numpy.floor(position).astype(numpy.int64), len(ordered) - 1)
+            upper = numpy.minimum(numpy.ceil(position).astype(numpy.int64), len(ordered) - 1)
+            fraction = position - lower
+            result[f'p{q}'] = numpy.where(
+                present, ordered[lower] * (1 - fraction) + ordered[upper] * fraction, numpy.nan
+            )
+        return result
+
+    # Distribution of ratios over RATIO_BINS, as a (groups x buckets) count matrix
+    buckets = numpy.digitize(ratio, RATIO_BINS)
+    distribution = numpy.bincount(
+        codes * len(RATIO_LABELS) + buckets, minlength=group_count * len(RATIO_LABELS)
+    ).reshape(group_count, len(RATIO_LABELS))
+
+    # Drift: least-squares slope of the ratio against completion date, per 30 days
+    x = completed_days - completed_days.min()
+    sum_x = numpy.bincount(codes, weights=x, minlength=group_count)
+    sum_y = numpy.bincount(codes, weights=ratio, minlength=group_count)
+    sum_xy = numpy.bincount(codes, weights=x * ratio, minlength=group_count)
+    sum_xx = numpy.bincount(codes, weights=x * x, minlength=group_count)
+    denominator = counts * sum_xx - sum_x * sum_x
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        drift = numpy.where(
+            (counts > 1) & (denominator > 1e-9),
+            (counts * sum_xy - sum_x * sum_y) / denominator * 30,
+            numpy.nan
+        )
+
+    return {
+        'count': counts,
+        'estimatedMean': mean(estimated),
+        'actualMean': mean(actual),
+        'errorMean': mean(error),
+        'absolutePercentError': mean(numpy.abs(error) / estimated * 100),
+        'errorPercentiles': percentiles(error),
+        'ratioPercentiles': percentiles(ratio),
+        'distribution': distribution,
+        'driftPer30Days': drift,
+    }
+
+
+def _number(value):
+    value = float(value)
+    return None if numpy.isnan(value) else round(value, 3)
+
+
+def _group_summary(stats, index):
+    return {
+        'count': int(stats['count'][index]),
+        'estimatedMean': _number(stats['estimatedMean'][index]),
+        'actualMean': _number(stats['actualMean'][index]),
+        'errorMean': _number(stats['errorMean'][index]),
+        'absolutePercentError': _number(stats['absolutePercentError'][index]),
+        'errorPercentiles': {key: _number(values[index]) for key, values in stats['errorPercentiles'].items()},
+        'ratioPercentiles': {key: _number(values[index]) for key, values in stats['ratioPercentiles'].items()},
+        'distribution': dict(zip(RATIO_LABELS, stats['distribution'][index].tolist())),
+        'driftPer30Days': _number(stats['driftPer30Days'][index]),
+    }
+
+
+def estimate_accuracy(group_by, start=None, end=None, min_samples=1):
+    """Overall and per-group estimate accuracy for completions in [start, end)"""
+    data = dataset()
+    mask = numpy.ones(len(data.estimated), dtype=bool)
+    epoch = datetime(1970, 1, 1)
+    if start is not None:
+        mask &= data.completed_days >= (start - epoch).total_seconds() / SECONDS_PER_DAY
+    if end is not None:
+        mask &= data.completed_days < (end - epoch).total_seconds() / SECONDS_PER_DAY
+
+    estimated, actual, completed_days = data.estimated[mask], data.actual[mask], data.completed_days[mask]
+    if not len(estimated):
+        return {'sampleSize': 0, 'overall': None, 'groups': []}
+
+    overall = grouped_stats(numpy.zeros(len(estimated), dtype=numpy.int64), 1, estimated, actual, completed_days)
+    keys = data.keys[group_by]
+    stats = grouped_stats(data.codes[group_by][mask], len(keys), estimated, actual, completed_days)
+
+    groups = []
+    for index, key in enumerate(keys):
+        if stats['count'][index] >= max(min_samples, 1):
+            groups.append({'key': key, **_group_summary(stats, index)})
+    groups.sort(key=lambda group: group['count'], reverse=True)
+
+    return {
+        'sampleSize': int(len(estimated)),
+        'overall': _group_summary(overall, 0),
+        'groups': groups
+    }
@@ -0,0 +1,91 @@
+import itertools
+import json
+import queue
+import threading
+import uuid
+from collections import deque
+
+
+class Subscription:
+    """A connected client: a bounded buffer of events waiting to be sent"""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class EventBroker:
+    """In-process fan-out of change events to Server-Sent Events clients.
+
+    Recent events are kept in a ring buffer so a reconnecting client can
+    resume from its Last-Event-ID. Ids are "<epoch>-<n>" with a per-process
+    epoch, so an id issued by another process (or before a restart) is
+    never mistaken for one of ours. A client that falls behind its bounded
+    buffer is disconnected instead of slowing publishers down; it will
+    reconnect and catch up from the ring buffer.
+    """
+
+    def __init__(self, history_size=1000, client_buffer=100):
+        self.client_buffer = client_buffer
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self.epoch = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        """Record an event and hand it to every connected client"""
+        with self._lock:
+            sequence = next(self._sequence)
+            event = (sequence, f'{self.epoch}-{sequence}', event_type, json.dumps(data, separators=(',', ':'), default=str))
+            self._history.append(event)
+            self._last_sequence = sequence
+            for subscription in self._subscribers:
+                if subscription.overflowed:
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                except queue.Full:
+                    subscription.overflowed = True
+        return event[1]
+
+    def _parse_id(self, event_id):
+        """Sequence number of an id this process issued, None for any other id"""
+        epoch, _, sequence = event_id.rpartition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; returns (subscription, events to replay, whether history was lost)"""
+        subscription = Subscription(self.client_buffer)
+        with self._lock:
+            backlog = []
+            missed = False
+            if last_event_id is not None:
+                sequence = self._parse_id(last_event_id)
+                if sequence is None or sequence > self._last_sequence:
+                    # Issued by another process or before a restart: nothing here follows it
+                    missed = True
+                else:
+                    backlog = [event for event in self._history if event[0] > sequence]
+                    oldest = self._history[0][0] if self._history else None
+                    missed = oldest is not None and sequence < oldest - 1
+            self._subscribers.add(subscription)
+        return subscription, backlog, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+def format_event(event):
+    _sequence, event_id, event_type, payload = event
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+broker = EventBroker()
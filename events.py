@@ -0,0 +1,45 @@
+import queue
+
+from flask import Blueprint, Response, request
+
+from src.event_broker import broker, format_event
+
+events_bp = Blueprint('events', __name__)
+
+KEEPALIVE_SECONDS = 15
+
+
+@events_bp.route('/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of task and routine changes"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId') or None
+
+    def generate():
+        # Subscribe lazily so a response that is never iterated leaves no subscriber behind
+        subscription, backlog, missed = broker.subscribe(last_event_id)
+        try:
+            yield 'retry: 3000\n\n'
+            if missed:
+                # The ring buffer no longer covers the gap: the client must refetch
+                yield 'event: reset\ndata: {}\n\n'
+            for event in backlog:
+                yield format_event(event)
+
+            while not subscription.overflowed:
+                try:
+                    event = subscription.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
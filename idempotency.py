@@ -0,0 +1,223 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.idempotency_key import IdempotencyKey, db
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# A claim older than this without a stored response belongs to a request
+# that died mid-way; a retry may take it over
+IN_FLIGHT_TIMEOUT = 60
+
+# status_code of a claim whose request committed its writes but has not
+# stored its response yet; set in the same transaction as those writes
+COMMITTED = 0
+
+# session.info entry holding the claim of the request running on the session
+CLAIM_INFO = 'idempotency_claim'
+
+# Completed responses kept in this worker, so most retries skip the database
+MEMORY_ENTRIES = 1024
+
+
+class ReplayCache:
+    """Bounded LRU of stored responses keyed by (scope, key), expiring with the table rows"""
+
+    def __init__(self, max_entries=MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry[1]
+
+    def set(self, cache_key, stored, expires_at):
+        with self._lock:
+            self._entries[cache_key] = (expires_at, stored)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+replay_cache = ReplayCache()
+
+
+def _error(message, status_code):
+    return jsonify({
+        'success': False,
+        'error': message
+    }), status_code
+
+
+def _replay(stored):
+    _fingerprint, status_code, mimetype, body = stored
+    response = current_app.response_class(body, status=status_code, mimetype=mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _load(scope, key, now):
+    """Stored response for the key, 'in-flight' while another request holds it,
+    'committed' when a dead request's writes went through without a response, or None
+    """
+    row = IdempotencyKey.query.filter(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at >= now - timedelta(hours=IdempotencyKey.RETENTION_HOURS)
+    ).first()
+    if row is None:
+        return None
+    if row.status_code is not None and row.status_code != COMMITTED:
+        return (row.fingerprint, row.status_code, row.mimetype, row.body), row.created_at
+    if row.created_at >= now - timedelta(seconds=IN_FLIGHT_TIMEOUT):
+        return 'in-flight', row.created_at
+    if row.status_code == COMMITTED:
+        return 'committed', row.created_at
+    return None
+
+
+def _claim(scope, key, fingerprint, now):
+    """Insert the in-flight row for the key; False when another request got there first"""
+    try:
+        IdempotencyKey.prune(now - timedelta(hours=IdempotencyKey.RETENTION_HOURS))
+        IdempotencyKey.query.filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.created_at < now - timedelta(seconds=IN_FLIGHT_TIMEOUT)
+        ).delete(synchronize_session=False)
+        db.session.add(IdempotencyKey(scope=scope, key=key, fingerprint=fingerprint, created_at=now))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _before_commit(session):
+    # Mark the claim in the transaction that commits the view's writes, so a
+    # retry never takes over a claim whose work already went through
+    claim = session.info.get(CLAIM_INFO)
+    if claim is None or claim['committed']:
+        return
+    session.query(IdempotencyKey).filter(
+        IdempotencyKey.scope == claim['scope'],
+        IdempotencyKey.key == claim['key'],
+        IdempotencyKey.status_code.is_(None)
+    ).update({'status_code': COMMITTED}, synchronize_session=False)
+    claim['committed'] = True
+
+
+def _track_claims():
+    if not event.contains(Session, 'before_commit', _before_commit):
+        event.listen(Session, 'before_commit', _before_commit)
+
+
+def _release(scope, key):
+    db.session.rollback()
+    IdempotencyKey.query.filter(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def idempotent(f):
+    """Run a POST view at most once per Idempotency-Key header.
+
+    The first request claims the key, runs the view and stores its
+    response; retries with the same key and body get that response back
+    without the view (and its writes) running again. Requests without the
+    header are not affected. 5xx responses of views that committed nothing
+    are not stored, so the client can retry them.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f'{HEADER} deve ter no máximo {MAX_KEY_LENGTH} caracteres', 400)
+
+        scope = f'{request.method} {request.path}'
+        fingerprint = hashlib.sha1(request.get_data()).hexdigest()
+        cache_key = (scope, key)
+        now = datetime.utcnow()
+
+        stored = replay_cache.get(cache_key)
+        if stored is None:
+            loaded = _load(scope, key, now)
+            if loaded is not None:
+                stored, created_at = loaded
+                if stored == 'in-flight':
+                    return _error('Requisição com esta chave de idempotência ainda em processamento', 409)
+                if stored == 'committed':
+                    return _error('Requisição com esta chave de idempotência já foi processada, mas sua resposta não foi armazenada', 409)
+                expires_at = created_at + timedelta(hours=IdempotencyKey.RETENTION_HOURS)
+                replay_cache.set(cache_key, stored, time.time() + (expires_at - now).total_seconds())
+
+        if stored is not None:
+            if stored[0] != fingerprint:
+                return _error('Chave de idempotência já usada com outra requisição', 422)
+            return _replay(stored)
+
+        if not _claim(scope, key, fingerprint, now):
+            return _error('Requisição com esta chave de idempotência ainda em processamento', 409)
+
+        _track_claims()
+        claim = db.session.info[CLAIM_INFO] = {'scope': scope, 'key': key, 'committed': False}
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.info.pop(CLAIM_INFO, None)
+            _release(scope, key)
+            raise
+        db.session.info.pop(CLAIM_INFO, None)
+
+        # A claim whose writes committed stays (as COMMITTED) even when released
+        if response.is_streamed or (response.status_code >= 500 and not claim['committed']):
+            _release(scope, key)
+            return response
+
+        body = response.get_data()
+        IdempotencyKey.query.filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None) | (IdempotencyKey.status_code == COMMITTED)
+        ).update({
+            'status_code': response.status_code,
+            'mimetype': response.mimetype,
+            'body': body
+        }, synchronize_session=False)
+        db.session.commit()
+        replay_cache.set(
+            cache_key,
+            (fingerprint, response.status_code, response.mimetype, body),
+            time.time() + IdempotencyKey.RETENTION_HOURS * 3600
+        )
+        return response
+
+    return decorated
@@ -0,0 +1,27 @@
+from datetime import datetime
+from src.models.user import db
+
+class IdempotencyKey(db.Model):
+    """Response of a POST sent with an Idempotency-Key, replayed when the client retries it"""
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(255), nullable=False)  # method and path, e.g. "POST /api/tasks"
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(40), nullable=False)  # SHA-1 of the request body
+    status_code = db.Column(db.Integer)  # NULL while the first request runs, 0 once its writes committed
+    mimetype = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
+    
+    # Keys older than this are pruned; a retry after that runs the request again
+    RETENTION_HOURS = 24
+    
+    @classmethod
+    def prune(cls, before):
+        """Delete keys created before the given datetime"""
+        return cls.query.filter(cls.created_at < before).delete(synchronize_session=False)
@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify
+from src.bulk_import import IMPORTERS, detect_format, iter_records, run_import
+from src.event_broker import broker
+
+import_bp = Blueprint('imports', __name__)
+
+def import_upload(kind):
+    """Stream the uploaded file (multipart 'file' field or raw body) through the importer"""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({
+                'success': False,
+                'error': 'Arquivo é obrigatório'
+            }), 400
+        stream, mimetype, filename = upload.stream, upload.mimetype, upload.filename
+    else:
+        stream, mimetype, filename = request.stream, request.mimetype, None
+    
+    fmt = detect_format(request.args.get('format'), mimetype, filename)
+    if fmt is None:
+        return jsonify({
+            'success': False,
+            'error': 'Formato não suportado (use csv ou ndjson)'
+        }), 400
+    
+    importer = IMPORTERS[kind]()
+    report = run_import(importer, iter_records(stream, fmt))
+    if report.imported:
+        broker.publish(f'{kind}.imported', {'count': report.imported})
+    
+    message = f'{report.imported} {importer.label}, {report.failed} com erro'
+    if report.stopped_at is not None:
+        message += f'; leitura interrompida na linha {report.stopped_at}'
+    return jsonify({
+        'success': True,
+        'data': report.to_dict(),
+        'message': message
+    })
+
+@import_bp.route('/tasks/import', methods=['POST'])
+def import_tasks():
+    """Bulk import tasks from a CSV or NDJSON upload"""
+    try:
+        return import_upload('tasks')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@import_bp.route('/marketplaces/import', methods=['POST'])
+def import_marketplaces():
+    """Bulk import marketplaces from a CSV or NDJSON upload"""
+    try:
+        return import_upload('marketplaces')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+
+class JobRun(db.Model):
+    """Start time of the last run of each periodic background job, shared by every worker"""
+    __tablename__ = 'job_runs'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    
+    @classmethod
+    def claim(cls, name, now, interval):
+        """Record a run starting now unless one started in the last `interval` seconds.
+        
+        The conditional UPDATE lets exactly one worker per interval win, so a
+        job runs once per deployment however many processes schedule it.
+        Returns True for the caller that should run the job.
+        """
+        claimed = cls.query.filter(
+            cls.name == name,
+            cls.started_at <= now - timedelta(seconds=interval)
+        ).update({'started_at': now}, synchronize_session=False)
+        if not claimed and db.session.get(cls, name) is None:
+            db.session.add(cls(name=name, started_at=now))
+            claimed = 1
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker inserted the first row at the same moment
+            db.session.rollback()
+            return False
+        return bool(claimed)
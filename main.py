@@ -3,7 +3,7 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 
@@ -15,29 +15,82 @@ from src.models.user import User
 from src.models.marketplace import Marketplace
 from src.models.routine import Routine, RoutineTask
 from src.models.task import Task, DailyTaskSummary
+from src.models.tombstone import Tombstone
+from src.models.task_event import TaskEvent
+from src.models.idempotency_key import IdempotencyKey
+from src.models.job_run import JobRun
 
 # Import routes
 from src.routes.user import user_bp
 from src.routes.marketplace import marketplace_bp
 from src.routes.routine import routine_bp
 from src.routes.task import task_bp
+from src.routes.events import events_bp
+from src.routes.sync import sync_bp
+from src.routes.batch import batch_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.metrics import metrics_bp
+from src.routes.imports import import_bp
+from src.routes.reports import reports_bp
+from src.routes.analytics import analytics_bp
+
+from src.compression import Compress
+from src.json_provider import FastJSONProvider
+from src.static_manifest import StaticManifest
+from src import table_versions
+from src.schema import ensure_schema
+from src.task_archive import ensure_archive_table
+from src.response_cache import response_cache
+from src.request_metrics import request_metrics
+from src.query_budget import query_budget_guard
+from src.overdue_sweeper import overdue_sweeper
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
+# orjson-backed JSON encoding (stdlib fallback), datetimes as ISO 8601
+app.json = FastJSONProvider(app)
+
+# Bump per-table version counters on every commit (drives ETags)
+table_versions.track_writes()
+
 # Enable CORS for all routes
 CORS(app, origins="*")
 
+# Negotiate gzip/brotli compression of API responses
+Compress(app)
+
+# Per-route latency, status and SQL instrumentation (exposed at /api/metrics)
+request_metrics.init_app(app)
+
+# Per-endpoint SQL budgets and N+1 detection (raises under TESTING, logs otherwise)
+query_budget_guard.init_app(app)
+
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(marketplace_bp, url_prefix='/api')
 app.register_blueprint(routine_bp, url_prefix='/api')
 app.register_blueprint(task_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+app.register_blueprint(batch_bp, url_prefix='/api')
+app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
+app.register_blueprint(import_bp, url_prefix='/api')
+app.register_blueprint(reports_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Response cache (set RESPONSE_CACHE_SHARED_PATH to share it across workers)
+app.config['RESPONSE_CACHE_SHARED_PATH'] = os.environ.get('RESPONSE_CACHE_SHARED_PATH')
+response_cache.init_app(app)
+
 # Initialize db with app
 db.init_app(app)
 
@@ -48,10 +101,16 @@ Routine.metadata.bind = db.engine
 RoutineTask.metadata.bind = db.engine
 Task.metadata.bind = db.engine
 DailyTaskSummary.metadata.bind = db.engine
+Tombstone.metadata.bind = db.engine
+TaskEvent.metadata.bind = db.engine
+IdempotencyKey.metadata.bind = db.engine
+JobRun.metadata.bind = db.engine
 
 # Initialize database and create sample data
 with app.app_context():
     db.create_all()
+    ensure_schema(db)
+    ensure_archive_table(db)
     
     # Create sample admin user if no users exist
     from src.models.user import User
@@ -224,22 +283,32 @@ with app.app_context():
         db.session.commit()
         print("Sample routines created")
 
+# Flag overdue tasks in bulk in the background (OVERDUE_SWEEP_INTERVAL=0 disables it)
+app.config['OVERDUE_SWEEP_INTERVAL'] = int(os.environ.get('OVERDUE_SWEEP_INTERVAL', 60))
+overdue_sweeper.init_app(app)
+
+# Serve not-yet-started routine occurrences as virtual tasks instead of inserting rows on execution
+app.config['VIRTUAL_ROUTINE_TASKS'] = os.environ.get('VIRTUAL_ROUTINE_TASKS', '').lower() in ('1', 'true', 'yes')
+
+# Index the built SPA once so serving it needs no per-request filesystem stat
+static_manifest = StaticManifest(app.static_folder)
+static_manifest.load()
+static_manifest.install_reload_signal()
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
         return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    entry = static_manifest.get(path) if path != "" else None
+    if entry is None:
+        entry = static_manifest.get('index.html')
+        if entry is None:
             return "index.html not found", 404
 
+    return static_manifest.send(entry)
+
 @app.errorhandler(404)
 def not_found(error):
     return {'success': False, 'error': 'Endpoint não encontrado'}, 404
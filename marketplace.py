@@ -1,12 +1,22 @@
 from flask import Blueprint, request, jsonify
 from src.models.marketplace import Marketplace, db
 from src.models.user import User
+from src.models.tombstone import Tombstone
+from src.serializers import marketplace_serializer, parse_fields
+from src.table_versions import conditional
+from src.response_cache import response_cache
+from src.query_budget import query_budget
+from src.versioning import version, expected_version, save_with_version, version_conflict, versioned_response
+from src.partial_update import MARKETPLACE_PATCH_FIELDS, patch_values, patch_table, patch_row, patch_data, patch_failure
 from datetime import datetime
 import uuid
 
 marketplace_bp = Blueprint('marketplace', __name__)
 
 @marketplace_bp.route('/marketplaces', methods=['GET'])
+@conditional('marketplaces')
+@response_cache.cached('marketplaces')
+@query_budget(1)
 def get_marketplaces():
     """Get all marketplaces with optional filtering"""
     try:
@@ -16,6 +26,14 @@ def get_marketplaces():
         priority_filter = request.args.get('priority', 'all')
         status_filter = request.args.get('status', 'all')
         favorites_only = request.args.get('favorites', 'false').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'))
+        
+        invalid_fields = marketplace_serializer.unknown_fields(fields)
+        if invalid_fields:
+            return jsonify({
+                'success': False,
+                'error': f'Campos inválidos: {", ".join(invalid_fields)}'
+            }), 400
         
         # Build query
         query = Marketplace.query
@@ -43,13 +61,13 @@ def get_marketplaces():
         if favorites_only:
             query = query.filter(Marketplace.favorite == True)
         
-        # Execute query
-        marketplaces = query.order_by(Marketplace.created_at.desc()).all()
+        # Execute query (plain column rows, serialized without hydrating entities)
+        rows = query.with_entities(*marketplace_serializer.columns(fields)).order_by(Marketplace.created_at.desc()).all()
         
         return jsonify({
             'success': True,
-            'data': [marketplace.to_dict() for marketplace in marketplaces],
-            'total': len(marketplaces)
+            'data': marketplace_serializer.serialize(rows, fields),
+            'total': len(rows)
         })
     
     except Exception as e:
@@ -111,17 +129,18 @@ def create_marketplace():
 def get_marketplace(marketplace_id):
     """Get a specific marketplace"""
     try:
-        marketplace = Marketplace.query.get(marketplace_id)
-        if not marketplace:
+        row = db.session.query(Marketplace, version).filter(Marketplace.id == marketplace_id).first()
+        if not row:
             return jsonify({
                 'success': False,
                 'error': 'Marketplace não encontrado'
             }), 404
         
-        return jsonify({
+        marketplace, current_version = row
+        return versioned_response({
             'success': True,
             'data': marketplace.to_dict()
-        })
+        }, current_version)
     
     except Exception as e:
         return jsonify({
@@ -141,6 +160,13 @@ def update_marketplace(marketplace_id):
             }), 404
         
         data = request.get_json()
+        try:
+            expected = expected_version(data)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
         
         # Update fields
         if 'name' in data:
@@ -184,13 +210,62 @@ def update_marketplace(marketplace_id):
             marketplace.custom_fields = json.dumps(data['customFields'])
         
         marketplace.updated_at = datetime.utcnow()
+        new_version = save_with_version(marketplace, expected)
+        if new_version is None:
+            db.session.rollback()
+            return version_conflict(Marketplace, marketplace_id)
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
             'data': marketplace.to_dict(),
             'message': 'Marketplace atualizado com sucesso'
-        })
+        }, new_version)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@marketplace_bp.route('/marketplaces/<marketplace_id>', methods=['PATCH'])
+def patch_marketplace(marketplace_id):
+    """Update only the given marketplace fields with a single UPDATE"""
+    try:
+        data = request.get_json(silent=True)
+        try:
+            expected = expected_version(data if isinstance(data, dict) else None)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
+        try:
+            values = patch_values(MARKETPLACE_PATCH_FIELDS, data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if not values:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum campo para atualizar'
+            }), 400
+        
+        row = patch_row(Marketplace, marketplace_serializer, marketplace_id, values, expected)
+        if row is None:
+            db.session.rollback()
+            return patch_failure(Marketplace, marketplace_id, expected, 'Marketplace não encontrado')
+        db.session.commit()
+        
+        return versioned_response({
+            'success': True,
+            'data': patch_data(marketplace_serializer, row),
+            'message': 'Marketplace atualizado com sucesso'
+        }, row.version)
     
     except Exception as e:
         db.session.rollback()
@@ -218,6 +293,7 @@ def delete_marketplace(marketplace_id):
             }), 400
         
         db.session.delete(marketplace)
+        Tombstone.record('marketplaces', marketplace_id)
         db.session.commit()
         
         return jsonify({
@@ -236,22 +312,18 @@ def delete_marketplace(marketplace_id):
 def toggle_favorite(marketplace_id):
     """Toggle marketplace favorite status"""
     try:
-        marketplace = Marketplace.query.get(marketplace_id)
-        if not marketplace:
-            return jsonify({
-                'success': False,
-                'error': 'Marketplace não encontrado'
-            }), 404
-        
-        marketplace.favorite = not marketplace.favorite
-        marketplace.updated_at = datetime.utcnow()
+        m = patch_table(Marketplace)
+        row = patch_row(Marketplace, marketplace_serializer, marketplace_id, {'favorite': db.not_(m.c.favorite)})
+        if row is None:
+            db.session.rollback()
+            return patch_failure(Marketplace, marketplace_id, None, 'Marketplace não encontrado')
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
-            'data': marketplace.to_dict(),
-            'message': f'Marketplace {"adicionado aos" if marketplace.favorite else "removido dos"} favoritos'
-        })
+            'data': patch_data(marketplace_serializer, row),
+            'message': f'Marketplace {"adicionado aos" if row.favorite else "removido dos"} favoritos'
+        }, row.version)
     
     except Exception as e:
         db.session.rollback()
@@ -264,22 +336,18 @@ def toggle_favorite(marketplace_id):
 def toggle_active(marketplace_id):
     """Toggle marketplace active status"""
     try:
-        marketplace = Marketplace.query.get(marketplace_id)
-        if not marketplace:
-            return jsonify({
-                'success': False,
-                'error': 'Marketplace não encontrado'
-            }), 404
-        
-        marketplace.active = not marketplace.active
-        marketplace.updated_at = datetime.utcnow()
+        m = patch_table(Marketplace)
+        row = patch_row(Marketplace, marketplace_serializer, marketplace_id, {'active': db.not_(m.c.active)})
+        if row is None:
+            db.session.rollback()
+            return patch_failure(Marketplace, marketplace_id, None, 'Marketplace não encontrado')
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
-            'data': marketplace.to_dict(),
-            'message': f'Marketplace {"ativado" if marketplace.active else "desativado"}'
-        })
+            'data': patch_data(marketplace_serializer, row),
+            'message': f'Marketplace {"ativado" if row.active else "desativado"}'
+        }, row.version)
     
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+from src.request_metrics import request_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request latency, status and SQL metrics in Prometheus text format"""
+    return Response(
+        request_metrics.render_prometheus(),
+        mimetype='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,150 @@
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import Boolean, Column, DateTime, false, literal, update
+from sqlalchemy.sql import ClauseElement
+
+from src.models.task import Task, db
+from src.models.job_run import JobRun
+from src.event_broker import broker
+from src import table_versions
+
+# The Task model does not declare these, so they are attached to its table
+# here: queries then qualify them as tasks.overdue, create_all() creates them
+# and src.schema adds them to older databases. While the sweeper runs, reads
+# filter on the flag instead of comparing due dates row by row.
+tasks = Task.__table__
+if 'overdue' not in tasks.c:
+    tasks.append_column(Column('overdue', Boolean, nullable=False, default=False, server_default=false()))
+    tasks.append_column(Column('overdue_at', DateTime))
+overdue = tasks.c.overdue
+overdue_at = tasks.c.overdue_at
+
+SWEEP_INTERVAL = 60
+
+# JobRun name the workers claim each interval, so one of them sweeps
+JOB_NAME = 'overdue_sweep'
+
+# Above this many newly overdue tasks a single summary event is pushed
+ALERT_LIMIT = 100
+
+
+def sweeping():
+    """Whether a sweeper keeps the flag current (OVERDUE_SWEEP_INTERVAL is not 0)"""
+    return bool(current_app.config.get('OVERDUE_SWEEP_INTERVAL'))
+
+
+def overdue_condition(now):
+    """Overdue tasks: flagged by the sweeper, or past due by date when no sweeper runs"""
+    if sweeping():
+        return db.and_(overdue == db.true(), tasks.c.status != 'completed')
+    return db.and_(tasks.c.due_date < now, tasks.c.status != 'completed')
+
+
+def flag_values(t, values, now):
+    """overdue / overdue_at assignments for an UPDATE of `t` writing `values` (by column name).
+    
+    Computed from the values being written, falling back to the row's
+    current ones, so a rescheduled or completed task does not keep a stale
+    flag until the next sweep. `t` is the tasks table or a copy of it.
+    """
+    def new_value(name):
+        value = values.get(name, t.c[name])
+        return value if isinstance(value, ClauseElement) else literal(value, t.c[name].type)
+    
+    is_overdue = db.and_(new_value('status') != 'completed', new_value('due_date') < now)
+    return {
+        'overdue': db.case((is_overdue, True), else_=False),
+        'overdue_at': db.case((is_overdue, db.func.coalesce(t.c.overdue_at, now)), else_=None)
+    }
+
+
+def _mark(now):
+    return update(tasks).where(
+        overdue == false(), tasks.c.due_date < now, tasks.c.status != 'completed'
+    ).values(overdue=True, overdue_at=now)
+
+
+def _clear(now):
+    return update(tasks).where(
+        overdue == db.true(),
+        db.or_(tasks.c.status == 'completed', tasks.c.due_date.is_(None), tasks.c.due_date >= now)
+    ).values(overdue=False, overdue_at=None)
+
+
+def sweep(now=None):
+    """Flag tasks that became overdue and clear ones that no longer are; returns (marked, cleared)"""
+    now = now or datetime.utcnow()
+    returning = db.engine.dialect.update_returning
+
+    try:
+        if returning:
+            marked = db.session.execute(
+                _mark(now).returning(tasks.c.id, tasks.c.title, tasks.c.marketplace_id, tasks.c.due_date)
+            ).all()
+            marked_count = len(marked)
+        else:
+            marked = None
+            marked_count = db.session.execute(_mark(now)).rowcount
+        cleared_count = db.session.execute(_clear(now)).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if marked_count or cleared_count:
+        table_versions.bump('tasks')
+
+    if marked is not None and marked_count <= ALERT_LIMIT:
+        for task_id, title, marketplace_id, due_date in marked:
+            broker.publish('task.overdue', {
+                'id': task_id,
+                'title': title,
+                'marketplace': marketplace_id,
+                'dueDate': due_date.isoformat() if due_date else None,
+                'overdueAt': now.isoformat()
+            })
+    elif marked_count:
+        broker.publish('tasks.overdue', {'count': marked_count, 'overdueAt': now.isoformat()})
+
+    return marked_count, cleared_count
+
+
+class OverdueSweeper:
+    """Runs sweep() every OVERDUE_SWEEP_INTERVAL seconds (0 disables it), in one worker per interval"""
+
+    def __init__(self, app=None):
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('OVERDUE_SWEEP_INTERVAL', SWEEP_INTERVAL)
+        interval = app.config['OVERDUE_SWEEP_INTERVAL']
+        if not interval or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(app, interval), name='overdue-sweeper', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app, interval):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    # Every worker runs this thread; only the one that claims the interval sweeps
+                    if JobRun.claim(JOB_NAME, datetime.utcnow(), interval):
+                        sweep()
+                except Exception:
+                    app.logger.exception('Overdue sweep failed')
+                finally:
+                    db.session.remove()
+            self._stop.wait(interval)
+
+
+overdue_sweeper = OverdueSweeper()
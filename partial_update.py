@@ -0,0 +1,158 @@
+import json
+from datetime import datetime
+
+from flask import jsonify
+from sqlalchemy import inspect
+
+from src.models.user import db
+from src.versioning import version, versioned_table, version_conflict
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _json(value):
+    return json.dumps(value)
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError(value)
+    return value
+
+
+# PATCH field specs, mirroring the serializers: key -> (columns, convert).
+# A field spanning several columns converts to a tuple of their values.
+TASK_PATCH_FIELDS = {
+    'title': (('title',), None),
+    'description': (('description',), None),
+    'status': (('status',), None),
+    'priority': (('priority',), None),
+    'category': (('category',), None),
+    'marketplace': (('marketplace_id',), None),
+    'assigneeId': (('assignee_id',), None),
+    'dueDate': (('due_date',), _datetime),
+    'estimatedTime': (('estimated_time',), None),
+    'links': (('links',), _json),
+    'notes': (('notes',), None),
+}
+
+ROUTINE_PATCH_FIELDS = {
+    'name': (('name',), None),
+    'description': (('description',), None),
+    'category': (('category',), None),
+    'priority': (('priority',), None),
+    'marketplace': (('marketplace_id',), None),
+    'frequency': (('frequency',), None),
+    'periodicityConfig': (('periodicity_config',), _json),
+    'estimatedTime': (('estimated_time',), None),
+    'responsible': (('responsible',), None),
+    'status': (('status',), None),
+    'notificationsEnabled': (('notifications_enabled',), _boolean),
+    'nextExecution': (('next_execution',), _datetime),
+}
+
+MARKETPLACE_PATCH_FIELDS = {
+    'name': (('name',), None),
+    'description': (('description',), None),
+    'color': (('color',), None),
+    'logoUrl': (('logo_url',), None),
+    'type': (('type',), None),
+    'priority': (('priority',), None),
+    'tags': (('tags',), _json),
+    'responsible': (('responsible',), None),
+    'active': (('active',), _boolean),
+    'favorite': (('favorite',), _boolean),
+    'urls': (('admin_url', 'reports_url', 'other_url'),
+        lambda urls: (urls.get('admin'), urls.get('reports'), urls.get('other'))),
+    'schedule': (('schedule_start', 'schedule_end'),
+        lambda schedule: (schedule.get('start'), schedule.get('end'))),
+    'timezone': (('timezone',), None),
+    'customFields': (('custom_fields',), _json),
+}
+
+
+def patch_values(fields, data):
+    """Column values for the whitelisted keys present in a PATCH body.
+
+    Raises ValueError (with a message for the client) on keys that cannot
+    be patched and on values that do not convert.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Corpo da requisição deve ser um objeto JSON')
+
+    values = {}
+    for key, value in data.items():
+        if key == 'version':
+            continue
+        if key not in fields:
+            raise ValueError(f'Campo não pode ser alterado: {key}')
+        columns, convert = fields[key]
+        if convert is not None:
+            try:
+                value = convert(value)
+            except (AttributeError, TypeError, ValueError):
+                raise ValueError(f'{key} inválido')
+        if len(columns) == 1:
+            values[columns[0]] = value
+        else:
+            values.update(zip(columns, value))
+    return values
+
+
+def patch_table(model):
+    """Table the PATCH UPDATEs go through (with the version column), for building values and conditions"""
+    return versioned_table(model.__table__)
+
+
+def patch_row(model, serializer, entity_id, values, expected=None, conditions=()):
+    """Write only `values` (plus updated_at and the version bump) in one UPDATE ... RETURNING.
+
+    `values` are keyed by column name and may be expressions over
+    patch_table(model), as may the extra `conditions`. Returns the updated
+    row, with the serializer's own-table columns and `version`, or None
+    when no row matched; the caller then rolls back and asks patch_failure why.
+    """
+    table = patch_table(model)
+    primary_key = table.c[inspect(model).primary_key[0].name]
+    returning = [table.c[attribute.property.columns[0].name]
+                 for attribute in serializer.columns(serializer.table_keys())]
+    returning.append(table.c.version)
+
+    statement = table.update().where(primary_key == entity_id, *conditions)
+    if expected is not None:
+        statement = statement.where(table.c.version == expected)
+    statement = statement.values(**values, updated_at=datetime.utcnow(), version=table.c.version + 1)
+
+    if db.engine.dialect.update_returning:
+        return db.session.execute(statement.returning(*returning)).first()
+
+    if not db.session.execute(statement).rowcount:
+        return None
+    return db.session.execute(
+        table.select().with_only_columns(*returning).where(primary_key == entity_id)
+    ).first()
+
+
+def patch_data(serializer, row):
+    """Response data for a row returned by patch_row (pair it with versioned_response)"""
+    return serializer.serialize([row], serializer.table_keys())[0]
+
+
+def patch_failure(model, entity_id, expected, not_found):
+    """404 or 412 response for a PATCH that matched no row.
+
+    Returns None when the row exists at the expected version, meaning one
+    of the caller's own conditions failed.
+    """
+    primary_key = inspect(model).primary_key[0]
+    current = db.session.query(version).select_from(model).filter(primary_key == entity_id).scalar()
+    if current is None:
+        return jsonify({
+            'success': False,
+            'error': not_found
+        }), 404
+    if expected is not None and current != expected:
+        return version_conflict(model, entity_id)
+    return None
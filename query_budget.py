@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import re
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request breaks its query budget or repeats a query (N+1)"""
+
+
+def fingerprint(statement):
+    """Normalize a SQL statement so repeats with different parameters compare equal"""
+    normalized = _WHITESPACE_RE.sub(' ', statement).strip()
+    normalized = _LITERAL_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('(?)', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may issue"""
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+class QueryBudget:
+    """Per-request SQL budget and N+1 detection.
+
+    Every statement is counted; with QUERY_FINGERPRINTING on (the default
+    in debug and testing) statements are also fingerprinted and any
+    fingerprint repeated QUERY_N_PLUS_ONE_THRESHOLD times is reported as
+    an N+1 pattern. QUERY_BUDGET_MODE is 'raise' (fail the request, meant
+    for tests), 'warn' (log, the production default) or 'off'.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # QUERY_BUDGET_MODE and QUERY_FINGERPRINTING default from app.testing/app.debug,
+        # read per request: both are usually switched on after init_app runs
+        app.config.setdefault('QUERY_N_PLUS_ONE_THRESHOLD', 5)
+        # endpoint -> max statements, overriding @query_budget
+        app.config.setdefault('QUERY_BUDGETS', {})
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @staticmethod
+    def mode():
+        return current_app.config.get('QUERY_BUDGET_MODE') or ('raise' if current_app.testing else 'warn')
+
+    @staticmethod
+    def fingerprinting():
+        enabled = current_app.config.get('QUERY_FINGERPRINTING')
+        return enabled if enabled is not None else (current_app.debug or current_app.testing)
+
+    def _before_request(self):
+        if self.mode() == 'off':
+            return
+        g.query_budget_count = 0
+        g.query_fingerprints = Counter() if self.fingerprinting() else None
+        g.query_samples = {}
+
+    def _after_request(self, response):
+        if 'query_budget_count' not in g:
+            return response
+
+        config = current_app.config
+        problems = []
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = config['QUERY_BUDGETS'].get(request.endpoint, getattr(view, 'query_budget', None))
+        if budget is not None and g.query_budget_count > budget:
+            problems.append(f'{g.query_budget_count} SQL statements, budget is {budget}')
+
+        if g.query_fingerprints:
+            threshold = config['QUERY_N_PLUS_ONE_THRESHOLD']
+            for key, count in g.query_fingerprints.most_common():
+                if count < threshold:
+                    break
+                problems.append(f'possible N+1: {count}x {g.query_samples[key]}')
+
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(problems)
+            if self.mode() == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning('Query budget: %s', message)
+
+        return response
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'query_budget_count' not in g:
+        return
+
+    g.query_budget_count += 1
+    if g.query_fingerprints is not None:
+        key, normalized = fingerprint(statement)
+        g.query_fingerprints[key] += 1
+        g.query_samples.setdefault(key, normalized[:200])
+
+
+query_budget_guard = QueryBudget()
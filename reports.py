@@ -0,0 +1,216 @@
+import csv
+import heapq
+import io
+import itertools
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional, CSV is always available
+    pyarrow = None
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy import select, union_all
+from src.models.task import Task, db
+from src.task_archive import archived_tasks, needs_archive
+from src.routine_occurrences import due_virtual_tasks, virtual_tasks, enabled as virtual_routine_tasks
+
+reports_bp = Blueprint('reports', __name__)
+
+# Rows fetched per server-side cursor partition, and per CSV chunk / Parquet row group
+REPORT_BATCH_ROWS = 10000
+
+# (column, type) of every exported field, in output order
+REPORT_COLUMNS = [
+    ('id', 'string'),
+    ('title', 'string'),
+    ('status', 'string'),
+    ('priority', 'string'),
+    ('category', 'string'),
+    ('marketplace_id', 'string'),
+    ('routine_id', 'int64'),
+    ('assignee_id', 'int64'),
+    ('due_date', 'timestamp'),
+    ('estimated_time', 'int64'),
+    ('started_at', 'timestamp'),
+    ('completed_at', 'timestamp'),
+    ('created_at', 'timestamp'),
+    ('updated_at', 'timestamp'),
+]
+
+def parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+def report_query(start, end, marketplace, assignee):
+    """SELECT over tasks (and the archive when the range reaches it), ordered by due date"""
+    def source(t):
+        conditions = []
+        if start is not None:
+            conditions.append(t.due_date >= start)
+        if end is not None:
+            conditions.append(t.due_date < end)
+        if marketplace:
+            conditions.append(t.marketplace_id == marketplace)
+        if assignee:
+            conditions.append(t.assignee_id == assignee)
+        return select(*[getattr(t, name) for name, _type in REPORT_COLUMNS]).where(*conditions)
+
+    live = source(Task)
+    # History without a start date covers everything, archived tasks included
+    if not needs_archive('all', start, start is None):
+        return live.order_by(Task.due_date.asc(), Task.id.asc())
+
+    combined = union_all(live, source(archived_tasks.c)).subquery()
+    return select(*combined.c).order_by(combined.c.due_date.asc(), combined.c.id.asc())
+
+def report_virtual_rows(start, end, marketplace, assignee):
+    """Rows (in REPORT_COLUMNS order) for the virtual routine tasks in the range, by due date"""
+    # Virtual tasks are unassigned; an open range covers the ones already due to run
+    if not virtual_routine_tasks() or assignee:
+        return []
+    if start is None and end is None:
+        tasks = due_virtual_tasks(marketplace=marketplace or None)
+    else:
+        tasks = virtual_tasks(start or datetime.min, end or datetime.max, marketplace=marketplace or None)
+    return [
+        (task['id'], task['title'], task['status'], task['priority'], task['category'], task['marketplace'],
+         task['routineId'], None, datetime.fromisoformat(task['dueDate']), task['estimatedTime'], None, None, None, None)
+        for task in tasks
+    ]
+
+def _report_order(row):
+    # Same order as report_query: due date (nulls first), then id
+    return (row[8] is not None, row[8] or datetime.min, row[0])
+
+def iter_partitions(statement, virtual_rows=()):
+    """Lists of at most REPORT_BATCH_ROWS rows from a server-side cursor, with virtual_rows merged in"""
+    result = db.session.execute(statement.execution_options(yield_per=REPORT_BATCH_ROWS))
+    if not virtual_rows:
+        for partition in result.partitions():
+            yield partition
+        return
+    rows = heapq.merge(result, sorted(virtual_rows, key=_report_order), key=_report_order)
+    while True:
+        partition = list(itertools.islice(rows, REPORT_BATCH_ROWS))
+        if not partition:
+            break
+        yield partition
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def generate_csv(statement, virtual_rows=()):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _type in REPORT_COLUMNS])
+    for rows in iter_partitions(statement, virtual_rows):
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_schema():
+    types = {
+        'string': pyarrow.string(),
+        'int64': pyarrow.int64(),
+        'timestamp': pyarrow.timestamp('us'),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in REPORT_COLUMNS])
+
+def generate_parquet(statement, virtual_rows=()):
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in iter_partitions(statement, virtual_rows):
+            # One row group per partition, built column by column
+            columns = list(zip(*rows))
+            batch = pyarrow.record_batch(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            )
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+@reports_bp.route('/reports/tasks', methods=['GET'])
+def export_tasks_report():
+    """Stream task history as CSV or Parquet, filtered by due date range, marketplace and assignee"""
+    try:
+        report_format = request.args.get('format', 'csv').lower()
+        if report_format not in ('csv', 'parquet'):
+            return jsonify({
+                'success': False,
+                'error': 'Formato não suportado (use csv ou parquet)'
+            }), 400
+
+        if report_format == 'parquet' and pyarrow is None:
+            return jsonify({
+                'success': False,
+                'error': 'Exportação Parquet indisponível (pyarrow não instalado)'
+            }), 400
+
+        try:
+            start = parse_day(request.args.get('from'))
+            end = parse_day(request.args.get('to'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Datas devem estar no formato AAAA-MM-DD'
+            }), 400
+        if end is not None:
+            # `to` is inclusive
+            end += timedelta(days=1)
+
+        filters = (start, end, request.args.get('marketplace'), request.args.get('assignee'))
+        statement = report_query(*filters)
+        virtual_rows = report_virtual_rows(*filters)
+        filename = f"tarefas-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{report_format}"
+
+        if report_format == 'parquet':
+            body, mimetype = generate_parquet(statement, virtual_rows), 'application/vnd.apache.parquet'
+        else:
+            body, mimetype = generate_csv(statement, virtual_rows), 'text/csv'
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
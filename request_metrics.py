@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+class RequestMetrics:
+    """Per-route latency histograms, status counts, in-flight gauge and SQL cost.
+
+    SQL statements are timed through the engine's before/after_cursor_execute
+    events and attributed to the request that issued them. Requests slower
+    than SLOW_REQUEST_SECONDS are logged together with their SQL.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = {}   # (method, route, status) -> count
+        self.latency = {}    # (method, route) -> [bucket counts..., sum, count]
+        self.sql = {}        # (method, route) -> [statements, seconds]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_SECONDS', 0.5)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['request_metrics'] = self
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_statements = []
+        with self._lock:
+            self.in_flight += 1
+
+    def _after_request(self, response):
+        g.response_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        started = g.pop('request_started', None)
+        if started is None:
+            return
+
+        duration = time.perf_counter() - started
+        method = request.method
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = g.pop('response_status', 500 if exc is not None else 200)
+
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = [0] * (len(LATENCY_BUCKETS) + 2)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+
+            sql = self.sql.setdefault((method, route), [0, 0.0])
+            sql[0] += g.sql_count
+            sql[1] += g.sql_time
+
+        if duration >= current_app.config['SLOW_REQUEST_SECONDS']:
+            slowest = sorted(g.sql_statements, key=lambda item: item[1], reverse=True)[:5]
+            logger.warning(
+                'Slow request %s %s: %.3fs, %d SQL statements (%.3fs)%s',
+                method, request.full_path, duration, g.sql_count, g.sql_time,
+                ''.join(f'\n  [{seconds * 1000:.1f}ms] {statement}' for statement, seconds in slowest)
+            )
+
+    def render_prometheus(self):
+        """Current metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP http_requests_in_flight Requests currently being served')
+            lines.append('# TYPE http_requests_in_flight gauge')
+            # The scrape itself is in flight; do not count it
+            lines.append(f'http_requests_in_flight {max(self.in_flight - 1, 0)}')
+
+            lines.append('# HELP http_requests_total Requests served by route and status')
+            lines.append('# TYPE http_requests_total counter')
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            lines.append('# HELP http_request_duration_seconds Request latency by route')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in zip(LATENCY_BUCKETS, histogram):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-1]}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {histogram[-2]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {histogram[-1]}')
+
+            lines.append('# HELP http_request_sql_statements_total SQL statements executed by route')
+            lines.append('# TYPE http_request_sql_statements_total counter')
+            for (method, route), (statements, _seconds) in sorted(self.sql.items()):
+                lines.append(f'http_request_sql_statements_total{{method="{method}",route="{route}"}} {statements}')
+
+            lines.append('# HELP http_request_sql_seconds_total Time spent in SQL by route')
+            lines.append('# TYPE http_request_sql_seconds_total counter')
+            for (method, route), (_statements, seconds) in sorted(self.sql.items()):
+                lines.append(f'http_request_sql_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context: a statement that raises never reaches
+    # after_cursor_execute, and its start time must not linger for the next one
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None or not has_request_context() or 'sql_count' not in g:
+        return
+
+    duration = time.perf_counter() - started
+    g.sql_count += 1
+    g.sql_time += duration
+    if len(g.sql_statements) < MAX_LOGGED_STATEMENTS:
+        g.sql_statements.append((statement, duration))
+
+
+request_metrics = RequestMetrics()
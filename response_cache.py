@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+from src import table_versions
+from src.shared_store import SharedStore
+
+
+class ResponseCache:
+    """LRU cache of JSON response bodies, bounded by a byte budget.
+
+    Entries are keyed by endpoint, query arguments and user scope, and are
+    tagged with the versions of the tables the view reads; a write to any of
+    those tables makes the entry stale. With RESPONSE_CACHE_SHARED_PATH set,
+    entries and table versions also go through a SharedStore file so every
+    worker on the host benefits; without it entries live at most
+    table_versions.LOCAL_MAX_AGE seconds.
+    """
+
+    def __init__(self, app=None):
+        self.max_bytes = 16 * 1024 * 1024
+        self.store = None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        app.config.setdefault('RESPONSE_CACHE_SHARED_PATH', None)
+
+        self.max_bytes = app.config['RESPONSE_CACHE_MAX_BYTES']
+        if app.config['RESPONSE_CACHE_SHARED_PATH']:
+            self.store = SharedStore(app.config['RESPONSE_CACHE_SHARED_PATH'], max_bytes=self.max_bytes)
+            table_versions.use_shared_store(self.store)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get(self, key, versions):
+        """Return (mimetype, body) when a fresh entry exists for these table versions"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_versions, expires_at, mimetype, body = entry
+                if entry_versions == versions and (expires_at is None or expires_at > now):
+                    self._entries.move_to_end(key)
+                    return mimetype, body
+                self._evict(key)
+
+        if self.store is not None:
+            found = self.store.get(key, versions)
+            if found is not None:
+                mimetype, body, expires_at = found
+                self._put(key, versions, expires_at, mimetype, body)
+                return mimetype, body
+
+        return None
+
+    def set(self, key, versions, ttl, mimetype, body):
+        if not table_versions.is_shared():
+            # Other workers' writes cannot invalidate this entry, so it must expire on its own
+            ttl = min(ttl or table_versions.LOCAL_MAX_AGE, table_versions.LOCAL_MAX_AGE)
+        expires_at = time.time() + ttl if ttl else None
+        self._put(key, versions, expires_at, mimetype, body)
+        if self.store is not None:
+            self.store.set(key, versions, expires_at, mimetype, body)
+
+    def _put(self, key, versions, expires_at, mimetype, body):
+        size = len(key) + len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (versions, expires_at, mimetype, body)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        _versions, _expires_at, _mimetype, body = self._entries.pop(key)
+        self._size -= len(key) + len(body)
+
+    @staticmethod
+    def request_key():
+        """Cache key for the current request: endpoint, sorted query args and user scope"""
+        user = getattr(request, 'current_user', None)
+        scope = str(user.id) if user is not None else ''
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        raw = f'{request.endpoint}|{args}|{scope}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def cached(self, *tables, ttl=None):
+        """Serve a GET view from the cache until one of `tables` is written (or `ttl` elapses)"""
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if request.method != 'GET' or not current_app.config['RESPONSE_CACHE_ENABLED']:
+                    return f(*args, **kwargs)
+
+                key = self.request_key()
+                versions = table_versions.current(*tables)
+                hit = self.get(key, versions)
+                if hit is not None:
+                    mimetype, body = hit
+                    response = current_app.response_class(body, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = f(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200 or response.is_streamed:
+                    return response
+
+                # Tag with the versions read before the view ran: a concurrent write makes it stale
+                self.set(key, versions, ttl, response.mimetype, response.get_data())
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return decorated
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -1,12 +1,24 @@
 from flask import Blueprint, request, jsonify
 from src.models.routine import Routine, RoutineTask, db
 from src.models.marketplace import Marketplace
+from src.models.tombstone import Tombstone
+from src.task_archive import ARCHIVE_TABLE, archive_counts
+from src.models.task_event import TaskEvent
+from src.serializers import routine_serializer, parse_fields
+from src.table_versions import conditional
+from src.response_cache import response_cache
+from src.event_broker import broker
+from src.idempotency import idempotent
+from src.routine_occurrences import FREQUENCY_STEPS, DUE_AFTER, build_task, insert_task, scheduled_execution, virtual_tasks, due_virtual_tasks, enabled as virtual_routine_tasks
+from src.versioning import version, expected_version, save_with_version, version_conflict, versioned_response
+from src.partial_update import ROUTINE_PATCH_FIELDS, patch_values, patch_row, patch_data, patch_failure
 from datetime import datetime, timedelta
 import json
 
 routine_bp = Blueprint('routine', __name__)
 
 @routine_bp.route('/routines', methods=['GET'])
+@conditional('routines', 'routine_tasks', 'marketplaces')
 def get_routines():
     """Get all routines with optional filtering"""
     try:
@@ -15,6 +27,14 @@ def get_routines():
         status_filter = request.args.get('status', 'all')
         frequency_filter = request.args.get('frequency', 'all')
         marketplace_filter = request.args.get('marketplace', 'all')
+        fields = parse_fields(request.args.get('fields'))
+        
+        invalid_fields = routine_serializer.unknown_fields(fields)
+        if invalid_fields:
+            return jsonify({
+                'success': False,
+                'error': f'Campos inválidos: {", ".join(invalid_fields)}'
+            }), 400
         
         # Build query
         query = Routine.query
@@ -37,14 +57,33 @@ def get_routines():
         if marketplace_filter != 'all':
             query = query.filter(Routine.marketplace_id == marketplace_filter)
         
+        # Sparse fieldsets: select only the requested columns as plain rows
+        if fields:
+            rows = query.outerjoin(Marketplace, Marketplace.id == Routine.marketplace_id) \
+                .with_entities(*routine_serializer.columns(fields)) \
+                .order_by(Routine.created_at.desc()).all()
+            
+            return jsonify({
+                'success': True,
+                'data': routine_serializer.serialize(rows, fields),
+                'total': len(rows)
+            })
+        
         # Execute query
         routines = query.order_by(Routine.created_at.desc()).all()
         
+        # Load the referenced marketplaces in one query instead of one per routine
+        marketplace_ids = {routine.marketplace_id for routine in routines}
+        marketplaces = {
+            marketplace.id: marketplace
+            for marketplace in Marketplace.query.filter(Marketplace.id.in_(marketplace_ids)).all()
+        } if marketplace_ids else {}
+        
         # Enrich with marketplace info
         result = []
         for routine in routines:
             routine_dict = routine.to_dict()
-            marketplace = Marketplace.query.get(routine.marketplace_id)
+            marketplace = marketplaces.get(routine.marketplace_id)
             if marketplace:
                 routine_dict['marketplaceName'] = marketplace.name
                 routine_dict['marketplaceColor'] = marketplace.color
@@ -63,6 +102,7 @@ def get_routines():
         }), 500
 
 @routine_bp.route('/routines', methods=['POST'])
+@idempotent
 def create_routine():
     """Create a new routine"""
     try:
@@ -134,13 +174,14 @@ def create_routine():
 def get_routine(routine_id):
     """Get a specific routine"""
     try:
-        routine = Routine.query.get(routine_id)
-        if not routine:
+        row = db.session.query(Routine, version).filter(Routine.id == routine_id).first()
+        if not row:
             return jsonify({
                 'success': False,
                 'error': 'Rotina não encontrada'
             }), 404
         
+        routine, current_version = row
         routine_dict = routine.to_dict()
         
         # Add marketplace info
@@ -152,10 +193,10 @@ def get_routine(routine_id):
         # Add routine tasks
         routine_dict['routineTasks'] = [task.to_dict() for task in routine.routine_tasks]
         
-        return jsonify({
+        return versioned_response({
             'success': True,
             'data': routine_dict
-        })
+        }, current_version)
     
     except Exception as e:
         return jsonify({
@@ -175,6 +216,13 @@ def update_routine(routine_id):
             }), 404
         
         data = request.get_json()
+        try:
+            expected = expected_version(data)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
         
         # Update fields
         if 'name' in data:
@@ -203,13 +251,62 @@ def update_routine(routine_id):
             routine.next_execution = datetime.fromisoformat(data['nextExecution']) if data['nextExecution'] else None
         
         routine.updated_at = datetime.utcnow()
+        new_version = save_with_version(routine, expected)
+        if new_version is None:
+            db.session.rollback()
+            return version_conflict(Routine, routine_id)
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
             'data': routine.to_dict(),
             'message': 'Rotina atualizada com sucesso'
-        })
+        }, new_version)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@routine_bp.route('/routines/<int:routine_id>', methods=['PATCH'])
+def patch_routine(routine_id):
+    """Update only the given routine fields with a single UPDATE"""
+    try:
+        data = request.get_json(silent=True)
+        try:
+            expected = expected_version(data if isinstance(data, dict) else None)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
+        try:
+            values = patch_values(ROUTINE_PATCH_FIELDS, data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if not values:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum campo para atualizar'
+            }), 400
+        
+        row = patch_row(Routine, routine_serializer, routine_id, values, expected)
+        if row is None:
+            db.session.rollback()
+            return patch_failure(Routine, routine_id, expected, 'Rotina não encontrada')
+        db.session.commit()
+        
+        return versioned_response({
+            'success': True,
+            'data': patch_data(routine_serializer, row),
+            'message': 'Rotina atualizada com sucesso'
+        }, row.version)
     
     except Exception as e:
         db.session.rollback()
@@ -230,6 +327,7 @@ def delete_routine(routine_id):
             }), 404
         
         db.session.delete(routine)
+        Tombstone.record('routines', routine_id)
         db.session.commit()
         
         return jsonify({
@@ -245,6 +343,7 @@ def delete_routine(routine_id):
         }), 500
 
 @routine_bp.route('/routines/<int:routine_id>/execute', methods=['POST'])
+@idempotent
 def execute_routine(routine_id):
     """Execute a routine (create tasks from routine tasks)"""
     try:
@@ -260,7 +359,15 @@ def execute_routine(routine_id):
         
         # Create tasks from routine tasks
         created_tasks = []
+        now = datetime.utcnow()
+        executed_at = scheduled_execution(routine, now)
         for routine_task in routine.routine_tasks:
+            if virtual_routine_tasks():
+                # Materialize the current occurrence under its virtual id, so it is not served twice
+                task = build_task(routine, routine_task, executed_at, executed_at + DUE_AFTER, now)
+                if insert_task(task):
+                    created_tasks.append(task)
+                continue
             task = Task(
                 id=str(uuid.uuid4()),
                 title=routine_task.title,
@@ -273,20 +380,26 @@ def execute_routine(routine_id):
                 due_date=datetime.utcnow() + timedelta(hours=24)  # Default to 24 hours
             )
             db.session.add(task)
+            TaskEvent.record(task.id, TaskEvent.CREATED)
             created_tasks.append(task)
         
         # Update routine execution info
         routine.last_execution = datetime.utcnow()
         
         # Calculate next execution based on frequency
-        if routine.frequency == 'daily':
-            routine.next_execution = datetime.utcnow() + timedelta(days=1)
-        elif routine.frequency == 'weekly':
-            routine.next_execution = datetime.utcnow() + timedelta(weeks=1)
-        elif routine.frequency == 'monthly':
-            routine.next_execution = datetime.utcnow() + timedelta(days=30)
+        if routine.frequency in FREQUENCY_STEPS:
+            if virtual_routine_tasks():
+                # Whole steps along the schedule, so the virtual occurrence ids stay put
+                routine.next_execution = executed_at + FREQUENCY_STEPS[routine.frequency]
+            else:
+                routine.next_execution = datetime.utcnow() + FREQUENCY_STEPS[routine.frequency]
         
         db.session.commit()
+        broker.publish('routine.executed', {
+            'id': routine.id,
+            'marketplace': routine.marketplace_id,
+            'createdTasks': [task.id for task in created_tasks]
+        })
         
         return jsonify({
             'success': True,
@@ -304,7 +417,49 @@ def execute_routine(routine_id):
             'error': str(e)
         }), 500
 
+@routine_bp.route('/routines/occurrences', methods=['GET'])
+@conditional('tasks', 'routines', 'routine_tasks', 'tombstones', bucket=60)
+def get_routine_occurrences():
+    """List the virtual (not yet started) routine tasks due in a date range"""
+    try:
+        if not virtual_routine_tasks():
+            return jsonify({
+                'success': False,
+                'error': 'Tarefas virtuais de rotinas estão desativadas'
+            }), 400
+        
+        try:
+            today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from') else today
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d') if request.args.get('to') else start + timedelta(days=6)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Datas devem estar no formato AAAA-MM-DD'
+            }), 400
+        
+        # `to` is inclusive
+        tasks = virtual_tasks(
+            start, end + timedelta(days=1),
+            routine_id=request.args.get('routine', type=int),
+            marketplace=request.args.get('marketplace')
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': tasks,
+            'total': len(tasks)
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @routine_bp.route('/routines/stats', methods=['GET'])
+@conditional('routines', 'tasks', ARCHIVE_TABLE, 'routine_tasks', 'tombstones', bucket=60)
+@response_cache.cached('routines', 'tasks', ARCHIVE_TABLE, 'routine_tasks', 'tombstones', ttl=60)
 def get_routine_stats():
     """Get routine statistics"""
     try:
@@ -320,9 +475,19 @@ def get_routine_stats():
         
         # Calculate completion rate (based on tasks created from routines)
         from src.models.task import Task
-        routine_tasks = Task.query.filter(Task.routine_id.isnot(None)).all()
-        completed_routine_tasks = [t for t in routine_tasks if t.status == 'completed']
-        completion_rate = round((len(completed_routine_tasks) / len(routine_tasks) * 100) if routine_tasks else 0, 1)
+        routine_tasks = Task.query.filter(Task.routine_id.isnot(None)).count()
+        completed_routine_tasks = Task.query.filter(
+            Task.routine_id.isnot(None),
+            Task.status == 'completed'
+        ).count()
+        # Archived routine tasks are all completed
+        archived_routine_tasks = archive_counts()[1]
+        routine_tasks += archived_routine_tasks
+        completed_routine_tasks += archived_routine_tasks
+        if virtual_routine_tasks():
+            # Occurrences past their execution time count as (not completed) routine tasks
+            routine_tasks += len(due_virtual_tasks())
+        completion_rate = round((completed_routine_tasks / routine_tasks * 100) if routine_tasks else 0, 1)
         
         return jsonify({
             'success': True,
@@ -0,0 +1,265 @@
+"""Not-yet-started routine occurrences served as virtual tasks.
+
+With VIRTUAL_ROUTINE_TASKS on, each active routine's schedule (anchored at
+next_execution and repeated every FREQUENCY_STEPS[frequency]) yields one
+virtual task per routine task and occurrence, computed on read. A virtual
+task has a deterministic id (occ-<routine task id>-<YYYYMMDD>); the row is
+inserted under that id only when an operator starts, edits or completes
+it, and deleting a virtual task leaves a tombstone that hides it.
+"""
+import re
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, union_all
+
+from src.models.routine import Routine, RoutineTask
+from src.models.task import Task, db
+from src.models.tombstone import Tombstone
+from src.models.task_event import TaskEvent
+
+# Same intervals execute_routine uses to move next_execution forward
+FREQUENCY_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30),
+}
+
+# Tasks created by an execution are due this long after it
+DUE_AFTER = timedelta(hours=24)
+
+# Occurrences due longer ago than this are considered skipped and no longer served
+LOOKBACK = timedelta(days=7)
+
+# Occurrences are never served further ahead than this
+HORIZON = timedelta(days=60)
+
+_ID_RE = re.compile(r'^occ-(\d+)-(\d{8})$')
+
+# Checked in one IN (...) per chunk, to stay under SQLite's bound parameter limit
+ID_CHUNK = 500
+
+
+def enabled():
+    return current_app.config.get('VIRTUAL_ROUTINE_TASKS', False)
+
+
+def occurrence_id(routine_task_id, executed_at):
+    return f'occ-{routine_task_id}-{executed_at:%Y%m%d}'
+
+
+def parse_occurrence_id(task_id):
+    """(routine task id, execution day) for an occurrence id, None for any other id"""
+    match = _ID_RE.match(task_id or '')
+    if match is None:
+        return None
+    try:
+        return int(match.group(1)), datetime.strptime(match.group(2), '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+def execution_times(frequency, anchor, created_at, start, end):
+    """Execution datetimes of a routine's schedule whose tasks are due in [start, end)"""
+    step = FREQUENCY_STEPS.get(frequency)
+    if step is None or anchor is None:
+        return []
+    first = start - DUE_AFTER
+    if created_at is not None and first < created_at:
+        first = created_at
+    last = end - DUE_AFTER
+
+    # The schedule is anchor + k * step for every integer k; start at the first k >= first
+    moment = anchor - ((anchor - first) // step) * step
+    times = []
+    while moment < last:
+        times.append(moment)
+        moment += step
+    return times
+
+
+def scheduled_execution(routine, now):
+    """Schedule time an execution at `now` stands for: the latest one due, or the upcoming one"""
+    step = FREQUENCY_STEPS.get(routine.frequency)
+    anchor = routine.next_execution or routine.created_at
+    if step is None or anchor is None:
+        return now
+    if anchor > now:
+        return anchor
+    return anchor + ((now - anchor) // step) * step
+
+
+def _serve_window(start, end, now):
+    return max(start, now - LOOKBACK), min(end, now + HORIZON)
+
+
+def _hidden_ids(candidates):
+    """Candidate ids that already have a row or were dismissed"""
+    hidden = set()
+    for offset in range(0, len(candidates), ID_CHUNK):
+        chunk = candidates[offset:offset + ID_CHUNK]
+        statement = union_all(
+            select(Task.id).where(Task.id.in_(chunk)),
+            select(Tombstone.entity_id).where(Tombstone.entity == 'tasks', Tombstone.entity_id.in_(chunk))
+        )
+        hidden.update(db.session.execute(statement).scalars())
+    return hidden
+
+
+def _task_dict(task_id, title, description, priority, category, marketplace_id, routine_id, due_date, estimated_time):
+    return {
+        'id': task_id,
+        'title': title,
+        'description': description,
+        'status': 'todo',
+        'priority': priority,
+        'category': category,
+        'marketplace': marketplace_id,
+        'routineId': routine_id,
+        'assigneeId': None,
+        'dueDate': due_date.isoformat(),
+        'estimatedTime': estimated_time,
+        'links': [],
+        'notes': None,
+        'startedAt': None,
+        'completedAt': None,
+        'createdAt': None,
+        'updatedAt': None,
+        'virtual': True,
+    }
+
+
+def virtual_tasks(start, end, routine_id=None, marketplace=None, now=None):
+    """Task dicts (Task.to_dict() shape plus `virtual`) for occurrences due in [start, end)"""
+    now = now or datetime.utcnow()
+    start, end = _serve_window(start, end, now)
+    if start >= end:
+        return []
+
+    query = db.session.query(
+        Routine.id, Routine.frequency, Routine.next_execution, Routine.created_at,
+        Routine.marketplace_id, Routine.category, Routine.priority,
+        RoutineTask.id, RoutineTask.title, RoutineTask.description, RoutineTask.estimated_time
+    ).join(RoutineTask, RoutineTask.routine_id == Routine.id).filter(
+        Routine.status == 'active',
+        Routine.frequency.in_(list(FREQUENCY_STEPS))
+    )
+    if routine_id is not None:
+        query = query.filter(Routine.id == routine_id)
+    if marketplace:
+        query = query.filter(Routine.marketplace_id == marketplace)
+
+    tasks = []
+    for (routine, frequency, next_execution, created_at, marketplace_id, category, priority,
+         template, title, description, estimated_time) in query.order_by(Routine.id, RoutineTask.order):
+        for executed_at in execution_times(frequency, next_execution or created_at, created_at, start, end):
+            tasks.append(_task_dict(
+                occurrence_id(template, executed_at), title, description, priority, category,
+                marketplace_id, routine, executed_at + DUE_AFTER, estimated_time
+            ))
+    if not tasks:
+        return []
+
+    hidden = _hidden_ids([task['id'] for task in tasks])
+    tasks = [task for task in tasks if task['id'] not in hidden]
+    tasks.sort(key=lambda task: task['dueDate'])
+    return tasks
+
+
+def due_virtual_tasks(routine_id=None, marketplace=None, now=None):
+    """Virtual tasks past their execution time, i.e. the ones that would be rows without virtual mode"""
+    now = now or datetime.utcnow()
+    return virtual_tasks(now - LOOKBACK, now + DUE_AFTER, routine_id, marketplace, now)
+
+
+def build_task(routine, routine_task, executed_at, due_date, now):
+    """Task row for one routine task of one execution"""
+    return Task(
+        id=occurrence_id(routine_task.id, executed_at),
+        title=routine_task.title,
+        description=routine_task.description,
+        marketplace_id=routine.marketplace_id,
+        routine_id=routine.id,
+        category=routine.category,
+        priority=routine.priority,
+        estimated_time=routine_task.estimated_time,
+        due_date=due_date,
+        created_at=now,
+        updated_at=now
+    )
+
+
+def _add_task(task):
+    # A plain add in the caller's transaction, never a SAVEPOINT: pysqlite only
+    # opens a transaction on the first write, so a savepoint taken before any
+    # would be the outermost one and its RELEASE would commit the row on its own
+    db.session.add(task)
+    TaskEvent.record(task.id, TaskEvent.CREATED)
+
+
+def insert_task(task):
+    """Add the task in the caller's transaction; False when its id already has a row"""
+    if db.session.query(Task.id).filter(Task.id == task.id).first() is not None:
+        return False
+    _add_task(task)
+    return True
+
+
+def _occurrence(task_id, now):
+    """(routine, routine task, execution time) behind an occurrence id that is served at `now`, or None"""
+    parsed = parse_occurrence_id(task_id)
+    if parsed is None or not enabled():
+        return None
+    routine_task_id, day = parsed
+    routine_task = RoutineTask.query.get(routine_task_id)
+    if routine_task is None:
+        return None
+    routine = Routine.query.get(routine_task.routine_id)
+    if routine is None or routine.status != 'active':
+        return None
+
+    # The schedule step is at least a day, so the day holds at most one execution
+    day_start = datetime.combine(day, datetime.min.time())
+    times = execution_times(
+        routine.frequency, routine.next_execution or routine.created_at, routine.created_at,
+        day_start + DUE_AFTER, day_start + DUE_AFTER + timedelta(days=1)
+    )
+    if not times:
+        return None
+    # Same window virtual_tasks serves, so an id outside it cannot be started or deleted
+    due_date = times[0] + DUE_AFTER
+    if not now - LOOKBACK <= due_date < now + HORIZON:
+        return None
+    return routine, routine_task, times[0]
+
+
+def virtual_task(task_id):
+    """The virtual task for an occurrence id that has no row and was not dismissed, or None"""
+    occurrence = _occurrence(task_id, datetime.utcnow())
+    if occurrence is None or _hidden_ids([task_id]):
+        return None
+    routine, routine_task, executed_at = occurrence
+    return _task_dict(
+        task_id, routine_task.title, routine_task.description, routine.priority, routine.category,
+        routine.marketplace_id, routine.id, executed_at + DUE_AFTER, routine_task.estimated_time
+    )
+
+
+def materialize(task_id, now=None):
+    """Insert the row behind a virtual task id, if it is a valid not-yet-stored occurrence.
+
+    Runs in the caller's transaction, so a failed operation on the new row
+    rolls the materialization back too. Returns True when a row was added.
+    """
+    if parse_occurrence_id(task_id) is None:
+        return False
+    now = now or datetime.utcnow()
+    occurrence = _occurrence(task_id, now)
+    if occurrence is None or _hidden_ids([task_id]):
+        return False
+
+    routine, routine_task, executed_at = occurrence
+    _add_task(build_task(routine, routine_task, executed_at, executed_at + DUE_AFTER, now))
+    # Flushed now: the callers' Core UPDATEs do not autoflush the session
+    db.session.flush()
+    return True
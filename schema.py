@@ -0,0 +1,63 @@
+from sqlalchemy import inspect, text
+
+# Columns added after the models were written. Added with ALTER TABLE at
+# startup when an existing database lacks them.
+COLUMNS = [
+    ('tasks', 'overdue', 'BOOLEAN NOT NULL DEFAULT FALSE'),
+    ('tasks', 'overdue_at', 'TIMESTAMP'),
+    # Optimistic concurrency counters (see src.versioning)
+    ('tasks', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('routines', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('marketplaces', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('users', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+]
+
+# Secondary indexes the models do not declare themselves. Created with
+# IF NOT EXISTS at startup so existing SQLite databases pick them up too.
+INDEXES = [
+    ('ix_tasks_updated_at', 'tasks', 'updated_at'),
+    ('ix_routines_updated_at', 'routines', 'updated_at'),
+    ('ix_marketplaces_updated_at', 'marketplaces', 'updated_at'),
+    # Task list filters all sort by due_date, so each filter column leads a
+    # composite index ending in due_date (checked by check_query_plans)
+    ('ix_tasks_due_date', 'tasks', 'due_date'),
+    ('ix_tasks_status_due_date', 'tasks', 'status, due_date'),
+    ('ix_tasks_marketplace_id_due_date', 'tasks', 'marketplace_id, due_date'),
+    ('ix_tasks_assignee_id_due_date', 'tasks', 'assignee_id, due_date'),
+    ('ix_tasks_priority_due_date', 'tasks', 'priority, due_date'),
+    ('ix_tasks_routine_id_status', 'tasks', 'routine_id, status'),
+    ('ix_routines_created_at', 'routines', 'created_at'),
+    ('ix_routines_next_execution', 'routines', 'next_execution'),
+    ('ix_routines_marketplace_id', 'routines', 'marketplace_id'),
+    ('ix_routines_status', 'routines', 'status'),
+    # The routine list sorts by created_at
+    ('ix_routines_status_created_at', 'routines', 'status, created_at'),
+    ('ix_routine_tasks_routine_id', 'routine_tasks', 'routine_id'),
+    ('ix_marketplaces_created_at', 'marketplaces', 'created_at'),
+    ('ix_tasks_overdue_due_date', 'tasks', 'overdue, due_date'),
+]
+
+
+def ensure_columns(db):
+    """Add any missing column"""
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = {}
+        for table, column, ddl in COLUMNS:
+            if table not in existing:
+                existing[table] = {info['name'] for info in inspector.get_columns(table)}
+            if column not in existing[table]:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def ensure_indexes(db):
+    """Create any missing secondary index"""
+    with db.engine.begin() as conn:
+        for name, table, columns in INDEXES:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+
+
+def ensure_schema(db):
+    """Bring an existing database up to date with COLUMNS and INDEXES"""
+    ensure_columns(db)
+    ensure_indexes(db)
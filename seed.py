@@ -0,0 +1,225 @@
+"""Seed a database with synthetic data at configurable scale.
+
+Usage: python -m src.seed --database bench.db [--marketplaces 50] [--routines 5000]
+                          [--tasks 1000000] [--users 500] [--days 730] [--seed 42]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from src.models.user import User, db
+from src.models.marketplace import Marketplace
+from src.models.routine import Routine, RoutineTask
+from src.models.task import Task
+from src.models.tombstone import Tombstone  # imported so create_all() creates their tables
+from src.models.task_event import TaskEvent
+from src.models.idempotency_key import IdempotencyKey
+from src.schema import ensure_schema
+
+BATCH_SIZE = 10000
+
+# Synthetic users all share this password (hashed once, scrypt is slow)
+BENCH_PASSWORD = 'benchmark'
+
+PRIORITIES = ('low', 'medium', 'high')
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+CATEGORIES = ('Monitoramento', 'Análise', 'Atendimento', 'Logística', 'Anúncios')
+COLORS = ('#3483FA', '#EE4D2D', '#FF9900', '#10B981', '#8B5CF6', '#F59E0B')
+
+
+def build_app(database):
+    """Minimal app bound to the target database (a path or a full SQLAlchemy URI)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database if '://' in database else f'sqlite:///{database}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def insert_batches(table, rows):
+    """Insert an iterable of row dicts in fixed-size Core executemany batches"""
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        total += len(batch)
+    db.session.commit()
+    return total
+
+
+def generate_users(count, now):
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    for i in range(count):
+        yield {
+            'username': f'bench-user-{i}',
+            'email': f'bench-user-{i}@example.com',
+            'password_hash': password_hash,
+            'name': f'Operador {i}',
+            'role': 'admin' if i == 0 else 'user',
+            'active': True,
+            'timezone': 'America/Sao_Paulo',
+            'notifications_enabled': True,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+
+def generate_marketplaces(count, rng, now):
+    for i in range(count):
+        yield {
+            'id': f'bench-marketplace-{i}',
+            'name': f'Marketplace {i}',
+            'description': 'Conta sintética para benchmark',
+            'color': rng.choice(COLORS),
+            'type': 'ecommerce',
+            'priority': rng.choice(PRIORITIES),
+            'tags': json.dumps(['benchmark']),
+            'responsible': f'Operador {i}',
+            'active': rng.random() > 0.1,
+            'favorite': rng.random() > 0.8,
+            'timezone': 'America/Sao_Paulo',
+            'custom_fields': '[]',
+            'created_at': now,
+            'updated_at': now,
+        }
+
+
+def generate_routines(count, marketplace_ids, rng, now):
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'name': f'Rotina {i}',
+            'description': 'Rotina sintética para benchmark',
+            'category': rng.choice(CATEGORIES),
+            'priority': rng.choice(PRIORITIES),
+            'marketplace_id': rng.choice(marketplace_ids),
+            'frequency': rng.choice(FREQUENCIES),
+            'periodicity_config': json.dumps({'time': '09:00'}),
+            'estimated_time': rng.choice((15, 30, 45, 60)),
+            'responsible': f'Operador {rng.randrange(100)}',
+            'status': 'active' if rng.random() > 0.2 else 'paused',
+            'notifications_enabled': True,
+            'next_execution': now + timedelta(hours=rng.randrange(1, 24 * 30)),
+            'created_at': now,
+            'updated_at': now,
+        }
+
+
+def generate_routine_tasks(routine_count, rng):
+    for routine_id in range(1, routine_count + 1):
+        for order in range(rng.randint(1, 5)):
+            yield {
+                'routine_id': routine_id,
+                'title': f'Passo {order + 1}',
+                'description': 'Etapa sintética',
+                'order': order,
+                'estimated_time': rng.choice((5, 10, 15, 20)),
+                'required': True,
+                'task_type': 'manual',
+                'configuration': '{}',
+            }
+
+
+def generate_tasks(count, days, marketplace_ids, routine_count, user_count, rng, now):
+    start = now - timedelta(days=days)
+    span = days * 86400
+    for i in range(count):
+        due_date = start + timedelta(seconds=rng.randrange(span))
+        created_at = due_date - timedelta(hours=rng.randrange(1, 72))
+        if due_date < now - timedelta(days=2):
+            status = 'completed' if rng.random() < 0.9 else 'todo'
+        else:
+            status = rng.choice(('todo', 'todo', 'in-progress', 'completed'))
+        started_at = due_date - timedelta(minutes=rng.randrange(10, 240)) if status != 'todo' else None
+        completed_at = started_at + timedelta(minutes=rng.randrange(5, 180)) if status == 'completed' else None
+
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'title': f'Tarefa {i}',
+            'description': 'Tarefa sintética para benchmark',
+            'status': status,
+            'priority': rng.choice(PRIORITIES),
+            'category': rng.choice(CATEGORIES),
+            'marketplace_id': rng.choice(marketplace_ids),
+            'routine_id': rng.randint(1, routine_count) if routine_count and rng.random() < 0.7 else None,
+            'assignee_id': rng.randint(1, user_count) if user_count and rng.random() < 0.8 else None,
+            'due_date': due_date,
+            'estimated_time': rng.choice((5, 10, 15, 30, 60)),
+            'links': '[]',
+            'started_at': started_at,
+            'completed_at': completed_at,
+            'created_at': created_at,
+            'updated_at': completed_at or started_at or created_at,
+        }
+
+
+def seed_database(marketplaces=50, routines=5000, tasks=1000000, users=500, days=730, seed=42, log=print):
+    """Populate the bound database; returns row counts per table"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    counts = {}
+
+    started = time.perf_counter()
+    counts['users'] = insert_batches(User.__table__, generate_users(users, now))
+    counts['marketplaces'] = insert_batches(Marketplace.__table__, generate_marketplaces(marketplaces, rng, now))
+    marketplace_ids = [f'bench-marketplace-{i}' for i in range(marketplaces)]
+    counts['routines'] = insert_batches(Routine.__table__, generate_routines(routines, marketplace_ids, rng, now))
+    counts['routine_tasks'] = insert_batches(RoutineTask.__table__, generate_routine_tasks(routines, rng))
+    log(f'Seeded reference data in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    counts['tasks'] = insert_batches(
+        Task.__table__,
+        generate_tasks(tasks, days, marketplace_ids, routines, users, rng, now)
+    )
+    log(f'Seeded {counts["tasks"]} tasks in {time.perf_counter() - started:.1f}s')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file path or SQLAlchemy URI')
+    parser.add_argument('--marketplaces', type=int, default=50)
+    parser.add_argument('--routines', type=int, default=5000)
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--days', type=int, default=730, help='Spread task due dates over this many past days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='Drop all tables first')
+    args = parser.parse_args()
+
+    app = build_app(args.database)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        ensure_schema(db)
+
+        if User.query.count() or Task.query.count():
+            parser.error('database is not empty (use --reset)')
+
+        counts = seed_database(
+            marketplaces=args.marketplaces,
+            routines=args.routines,
+            tasks=args.tasks,
+            users=args.users,
+            days=args.days,
+            seed=args.seed
+        )
+    print(json.dumps(counts))
+
+
+if __name__ == '__main__':
+    main()
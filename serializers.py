@@ -0,0 +1,210 @@
+import threading
+from collections import OrderedDict
+
+from src.json_provider import loads
+from src.models.marketplace import Marketplace
+from src.models.routine import Routine
+from src.models.task import Task
+from src.models.user import User
+
+
+def _json_list(value):
+    return loads(value) if value else []
+
+
+def _json_object(value):
+    return loads(value) if value else {}
+
+
+def _initials(name, username):
+    if name:
+        parts = name.split()
+        if len(parts) >= 2:
+            return f"{parts[0][0]}{parts[1][0]}".upper()
+        return parts[0][:2].upper()
+    return username[:2].upper()
+
+
+def parse_fields(value):
+    """Split a ?fields=id,title,dueDate parameter into output keys (None when absent)"""
+    if not value:
+        return None
+    keys = [key.strip() for key in value.split(',') if key.strip()]
+    return keys or None
+
+
+# Query plans cached per serializer, least recently used evicted first
+MAX_PLANS = 128
+
+
+class RowSerializer:
+    """Serialize plain column rows of one model straight to JSON-ready values.
+
+    Each field is (key, columns, convert). Columns are attribute names of
+    the model, or attributes of a joined model. Fields backed by a single
+    column with no converter are copied as-is; datetimes are left for the
+    JSON provider to encode. Rows come from Query.with_entities(*columns(keys)),
+    so no ORM entity is ever hydrated and to_dict() is bypassed. Passing a
+    subset of keys (?fields=) narrows the SELECT to just those columns.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.keys = [key for key, _columns, _convert in fields]
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _plan(self, keys):
+        # Output order follows self.fields, so any order or repetition of ?fields= shares a plan
+        plan_key = frozenset(key for key in keys if key in self.keys) if keys else None
+        with self._lock:
+            plan = self._plans.get(plan_key)
+            if plan is not None:
+                self._plans.move_to_end(plan_key)
+                return plan
+
+        selected = [field for field in self.fields if keys is None or field[0] in keys]
+        plain = [field for field in selected if len(field[1]) == 1 and field[2] is None]
+        converted = [field for field in selected if not (len(field[1]) == 1 and field[2] is None)]
+
+        # Plain fields come first so each row can be zipped onto their keys directly
+        names, attributes = [], []
+        for _key, field_columns, _convert in plain:
+            name, attribute = self._resolve(field_columns[0])
+            names.append(name)
+            attributes.append(attribute)
+
+        converters = []
+        for key, field_columns, convert in converted:
+            indexes = []
+            for column in field_columns:
+                name, attribute = self._resolve(column)
+                if name not in names:
+                    names.append(name)
+                    attributes.append(attribute)
+                indexes.append(names.index(name))
+            converters.append((key, tuple(indexes), convert))
+
+        plan = (
+            [key for key, _columns, _convert in plain],
+            attributes,
+            converters
+        )
+        with self._lock:
+            self._plans[plan_key] = plan
+            while len(self._plans) > MAX_PLANS:
+                self._plans.popitem(last=False)
+        return plan
+
+    def _resolve(self, column):
+        if isinstance(column, str):
+            return column, getattr(self.model, column)
+        return f'{column.class_.__name__}.{column.key}', column
+
+    def unknown_fields(self, keys):
+        """Requested keys this serializer cannot produce"""
+        return [key for key in keys or () if key not in self.keys]
+
+    def table_keys(self):
+        """Output keys computed only from the model's own columns (no joins)"""
+        return [
+            key for key, field_columns, _convert in self.fields
+            if all(isinstance(column, str) for column in field_columns)
+        ]
+
+    def columns(self, keys=None):
+        """Column attributes to select for the given output keys (all when None)"""
+        return self._plan(keys)[1]
+
+    def serialize(self, rows, keys=None):
+        """Turn rows selected with columns(keys) into a list of JSON-ready dicts"""
+        names, _columns, converters = self._plan(keys)
+        result = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for key, indexes, convert in converters:
+                item[key] = convert(*[row[i] for i in indexes])
+            result.append(item)
+        return result
+
+
+task_serializer = RowSerializer(Task, [
+    ('id', ('id',), None),
+    ('title', ('title',), None),
+    ('description', ('description',), None),
+    ('status', ('status',), None),
+    ('priority', ('priority',), None),
+    ('category', ('category',), None),
+    ('marketplace', ('marketplace_id',), None),
+    ('routineId', ('routine_id',), None),
+    ('assigneeId', ('assignee_id',), None),
+    ('dueDate', ('due_date',), None),
+    ('estimatedTime', ('estimated_time',), None),
+    ('links', ('links',), _json_list),
+    ('notes', ('notes',), None),
+    ('startedAt', ('started_at',), None),
+    ('completedAt', ('completed_at',), None),
+    ('createdAt', ('created_at',), None),
+    ('updatedAt', ('updated_at',), None),
+])
+
+routine_serializer = RowSerializer(Routine, [
+    ('id', ('id',), None),
+    ('name', ('name',), None),
+    ('description', ('description',), None),
+    ('category', ('category',), None),
+    ('priority', ('priority',), None),
+    ('marketplace', ('marketplace_id',), None),
+    ('frequency', ('frequency',), None),
+    ('periodicityConfig', ('periodicity_config',), _json_object),
+    ('estimatedTime', ('estimated_time',), None),
+    ('responsible', ('responsible',), None),
+    ('status', ('status',), None),
+    ('notificationsEnabled', ('notifications_enabled',), None),
+    ('lastExecution', ('last_execution',), None),
+    ('nextExecution', ('next_execution',), None),
+    ('createdAt', ('created_at',), None),
+    ('updatedAt', ('updated_at',), None),
+    ('marketplaceName', (Marketplace.name,), None),
+    ('marketplaceColor', (Marketplace.color,), None),
+])
+
+marketplace_serializer = RowSerializer(Marketplace, [
+    ('id', ('id',), None),
+    ('name', ('name',), None),
+    ('description', ('description',), None),
+    ('color', ('color',), None),
+    ('logoUrl', ('logo_url',), None),
+    ('type', ('type',), None),
+    ('priority', ('priority',), None),
+    ('tags', ('tags',), _json_list),
+    ('responsible', ('responsible',), None),
+    ('active', ('active',), None),
+    ('favorite', ('favorite',), None),
+    ('urls', ('admin_url', 'reports_url', 'other_url'),
+        lambda admin, reports, other: {'admin': admin, 'reports': reports, 'other': other}),
+    ('schedule', ('schedule_start', 'schedule_end'),
+        lambda start, end: {'start': start, 'end': end}),
+    ('timezone', ('timezone',), None),
+    ('customFields', ('custom_fields',), _json_list),
+    ('createdAt', ('created_at',), None),
+    ('updatedAt', ('updated_at',), None),
+    ('weeklyTasks', (), lambda: {'total': 0, 'completed': 0, 'pending': 0}),
+])
+
+user_serializer = RowSerializer(User, [
+    ('id', ('id',), None),
+    ('username', ('username',), None),
+    ('email', ('email',), None),
+    ('name', ('name',), None),
+    ('avatarUrl', ('avatar_url',), None),
+    ('role', ('role',), None),
+    ('active', ('active',), None),
+    ('timezone', ('timezone',), None),
+    ('notificationsEnabled', ('notifications_enabled',), None),
+    ('initials', ('name', 'username'), _initials),
+    ('createdAt', ('created_at',), None),
+    ('updatedAt', ('updated_at',), None),
+    ('lastLogin', ('last_login',), None),
+])
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+class SharedStore:
+    """Small SQLite file shared by every worker on the host.
+
+    Holds the per-table version counters and cached response bodies so a
+    write handled by one worker invalidates what the others have cached.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        with self._transaction() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, versions TEXT NOT NULL, expires_at REAL, '
+                'mimetype TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)')
+            conn.execute(
+                "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('__epoch__', ?)",
+                (int(uuid.uuid4().int % 2 ** 31),)
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def epoch(self):
+        row = self._conn().execute("SELECT version FROM table_versions WHERE name = '__epoch__'").fetchone()
+        return format(row[0], 'x')
+
+    def bump_versions(self, tables):
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO table_versions (name, version) VALUES (?, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1',
+                [(table,) for table in tables]
+            )
+
+    def versions(self, tables):
+        placeholders = ','.join('?' * len(tables))
+        rows = self._conn().execute(
+            f'SELECT name, version FROM table_versions WHERE name IN ({placeholders})', tables
+        ).fetchall()
+        found = dict(rows)
+        return tuple(found.get(table, 0) for table in tables)
+
+    def get(self, key, versions):
+        """Return (mimetype, body, expires_at) if a fresh entry exists for these table versions"""
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT versions, expires_at, mimetype, body FROM response_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stored_versions, expires_at, mimetype, body = row
+        now = time.time()
+        if json.loads(stored_versions) != list(versions) or (expires_at is not None and expires_at < now):
+            conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+            return None
+
+        conn.execute('UPDATE response_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return mimetype, body, expires_at
+
+    def set(self, key, versions, expires_at, mimetype, body):
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO response_cache '
+                '(key, versions, expires_at, mimetype, body, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, json.dumps(list(versions)), expires_at, mimetype, body, len(body), time.time())
+            )
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM response_cache').fetchone()[0]
+            # Evict least recently used entries until back under the byte budget
+            while total > self.max_bytes:
+                victim = conn.execute(
+                    'SELECT key, size FROM response_cache ORDER BY accessed_at LIMIT 1'
+                ).fetchone()
+                if victim is None:
+                    break
+                conn.execute('DELETE FROM response_cache WHERE key = ?', (victim[0],))
+                total -= victim[1]
@@ -0,0 +1,157 @@
+import hashlib
+import mimetypes
+import os
+import re
+import signal
+import threading
+
+from flask import Response, request, send_from_directory
+from werkzeug.wsgi import wrap_file
+
+# Vite emits content-hashed bundles such as assets/index-4f3a9c1e.js
+HASHED_ASSET_RE = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Precompressed variants produced at build time, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Type of a compressed file served as-is (no uncompressed sibling to be a variant of)
+ARCHIVE_MIMETYPES = {'gzip': 'application/gzip'}
+
+
+class StaticEntry:
+    """A file of the static folder as recorded in the manifest"""
+
+    __slots__ = ('path', 'size', 'etag', 'mimetype', 'cache_control', 'variants')
+
+    def __init__(self, path, size, etag, mimetype, cache_control):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.variants = {}
+
+
+class StaticManifest:
+    """In-memory index of the SPA build so serving it needs no filesystem stat"""
+
+    def __init__(self, root):
+        self.root = root
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Scan the static folder and atomically swap in the new manifest"""
+        entries = {}
+        compressed = []
+
+        if self.root and os.path.isdir(self.root):
+            for dirpath, _dirnames, filenames in os.walk(self.root):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    rel_path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+
+                    if rel_path.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                        compressed.append((rel_path, full_path))
+                        continue
+
+                    entries[rel_path] = self._build_entry(rel_path, full_path)
+
+        # Attach .br/.gz files to the asset they were compressed from; one without an
+        # uncompressed sibling (e.g. a downloadable archive) is served as a file of its own
+        for rel_path, full_path in compressed:
+            for encoding, suffix in ENCODINGS:
+                if not rel_path.endswith(suffix):
+                    continue
+                entry = entries.get(rel_path[:-len(suffix)])
+                if entry is None:
+                    entries[rel_path] = self._build_entry(rel_path, full_path)
+                else:
+                    entry.variants[encoding] = (
+                        full_path,
+                        os.path.getsize(full_path),
+                        f'{entry.etag}-{encoding}'
+                    )
+                break
+
+        with self._lock:
+            self.entries = entries
+
+        return len(entries)
+
+    def _build_entry(self, rel_path, full_path):
+        digest = hashlib.sha1()
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+
+        mimetype, encoding = mimetypes.guess_type(rel_path)
+        if encoding:
+            # Sent as stored, not decoded by the browser, so the type is the archive's own
+            mimetype = ARCHIVE_MIMETYPES.get(encoding)
+        mimetype = mimetype or 'application/octet-stream'
+        if HASHED_ASSET_RE.search(rel_path):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = REVALIDATE_CACHE_CONTROL
+
+        return StaticEntry(
+            full_path,
+            os.path.getsize(full_path),
+            digest.hexdigest()[:20],
+            mimetype,
+            cache_control
+        )
+
+    def get(self, path):
+        """Return the manifest entry for a relative path, if any"""
+        return self.entries.get(path)
+
+    def install_reload_signal(self):
+        """Reload the manifest on SIGHUP (POSIX only, main thread only)"""
+        if not hasattr(signal, 'SIGHUP'):
+            return False
+        if threading.current_thread() is not threading.main_thread():
+            return False
+
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.load())
+        return True
+
+    def send(self, entry):
+        """Build the response for an entry, honouring If-None-Match and Accept-Encoding"""
+        path, size, etag = entry.path, entry.size, entry.etag
+        encoding = None
+
+        for candidate, _suffix in ENCODINGS:
+            if candidate in entry.variants and request.accept_encodings[candidate] > 0:
+                encoding = candidate
+                path, size, etag = entry.variants[candidate]
+                break
+
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            try:
+                stream = open(path, 'rb')
+            except OSError:
+                # Deleted or replaced since the manifest was built: serve whatever is on
+                # disk now (404 when the file is gone) until the next reload
+                return send_from_directory(self.root, os.path.relpath(entry.path, self.root))
+            response = Response(
+                wrap_file(request.environ, stream),
+                mimetype=entry.mimetype,
+                direct_passthrough=True
+            )
+            response.content_length = size
+            if encoding:
+                response.content_encoding = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = entry.cache_control
+        if entry.variants:
+            response.vary.add('Accept-Encoding')
+
+        return response
@@ -0,0 +1,86 @@
+from flask import Blueprint, request, jsonify
+from src.models.task import Task, db
+from src.models.routine import Routine
+from src.models.marketplace import Marketplace
+from src.models.tombstone import Tombstone
+from src.serializers import task_serializer, routine_serializer, marketplace_serializer
+from src.query_budget import query_budget
+from src.routine_occurrences import due_virtual_tasks, enabled as virtual_routine_tasks
+from datetime import datetime, timedelta
+
+sync_bp = Blueprint('sync', __name__)
+
+# Rows committed shortly after their updated_at was stamped must not be missed,
+# so each delta re-reads this window; clients apply rows idempotently by id.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+def encode_token(moment):
+    """Opaque sync token: the snapshot time in microseconds since the epoch"""
+    return format(int((moment - datetime(1970, 1, 1)).total_seconds() * 1000000), 'x')
+
+def decode_token(token):
+    return datetime(1970, 1, 1) + timedelta(microseconds=int(token, 16))
+
+@sync_bp.route('/sync', methods=['GET'])
+@query_budget(6)  # two of them for virtual routine tasks, when enabled
+def sync():
+    """Return tasks, routines and marketplaces changed since a sync token, plus tombstones"""
+    try:
+        token = request.args.get('since')
+        now = datetime.utcnow()
+        
+        since = None
+        if token:
+            try:
+                since = decode_token(token)
+            except (ValueError, OverflowError):
+                return jsonify({
+                    'success': False,
+                    'error': 'Token de sincronização inválido'
+                }), 400
+        
+        # Without a token, or with one older than the tombstone retention, send everything
+        full = since is None or since < now - timedelta(days=Tombstone.RETENTION_DAYS)
+        
+        entities = [
+            ('tasks', Task, task_serializer),
+            ('routines', Routine, routine_serializer),
+            ('marketplaces', Marketplace, marketplace_serializer)
+        ]
+        
+        data = {}
+        deleted = {}
+        for name, model, serializer in entities:
+            query = db.session.query(*serializer.columns()).select_from(model)
+            if model is Routine:
+                query = query.outerjoin(Marketplace, Marketplace.id == Routine.marketplace_id)
+            if not full:
+                query = query.filter(model.updated_at > since - SYNC_OVERLAP)
+            data[name] = serializer.serialize(query.all())
+            deleted[name] = []
+        
+        if not full:
+            tombstones = Tombstone.query.filter(Tombstone.deleted_at > since - SYNC_OVERLAP).all()
+            for tombstone in tombstones:
+                deleted.setdefault(tombstone.entity, []).append(tombstone.entity_id)
+        
+        if virtual_routine_tasks():
+            # Not versioned by updated_at, so always sent in full; a client replaces its copy
+            # (an occurrence that became a row arrives in `tasks` under the same id)
+            data['virtualTasks'] = due_virtual_tasks(now=now)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                **data,
+                'deleted': deleted,
+                'full': full,
+                'token': encode_token(now)
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
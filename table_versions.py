@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.compression import matching_etag
+
+# Per-table modification counters. By default they live in this process and
+# ETags carry a per-process epoch so a restart never replays an old tag; with
+# a SharedStore configured every worker reads and bumps the same counters.
+_versions = {}
+_lock = threading.Lock()
+_epoch = uuid.uuid4().hex[:8]
+_store = None
+
+# Without a SharedStore, writes on other workers never reach these counters, so
+# ETags (and cached responses) also expire after this many seconds
+LOCAL_MAX_AGE = 60
+
+
+def use_shared_store(store):
+    """Keep the counters in a SharedStore so writes on one worker invalidate all"""
+    global _store, _epoch
+    _store = store
+    _epoch = store.epoch()
+
+
+def bump(*tables):
+    """Mark tables as modified (call directly after writes that bypass the ORM session)"""
+    if _store is not None:
+        _store.bump_versions(tables)
+        return
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def is_shared():
+    return _store is not None
+
+
+def current(*tables):
+    """Current version of each table, in the order given"""
+    if _store is not None:
+        return _store.versions(tables)
+    return tuple(_versions.get(table, 0) for table in tables)
+
+
+def _written_tables(session):
+    return session.info.setdefault('written_tables', set())
+
+
+def _after_flush(session, flush_context):
+    tables = _written_tables(session)
+    for obj in session.new | session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(obj.__table__.name)
+
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk UPDATE/DELETE/INSERT statements run through the session skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+
+def _after_commit(session):
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        bump(*tables)
+
+
+def _after_rollback(session):
+    session.info.pop('written_tables', None)
+
+
+def track_writes():
+    """Bump table versions whenever a session commits changes to them"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'do_orm_execute', _do_orm_execute)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def compute_etag(tables, bucket=None):
+    """ETag for the current request from the URL and the versions of the tables it reads"""
+    parts = [_epoch, request.endpoint or '', request.query_string.decode('utf-8')]
+    parts.extend(str(version) for version in current(*tables))
+    if _store is None:
+        bucket = min(bucket or LOCAL_MAX_AGE, LOCAL_MAX_AGE)
+    if bucket:
+        # Time-dependent results (today, overdue) roll over at least every `bucket` seconds
+        parts.append(str(int(time.time() // bucket)))
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def conditional(*tables, bucket=None):
+    """Answer If-None-Match with 304 before the view runs any query.
+
+    The ETag only changes when one of `tables` is written (or when the
+    optional time `bucket` rolls over), so it is computed without touching
+    the database.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            etag = compute_etag(tables, bucket)
+            matched = matching_etag(etag, request.if_none_match)
+            if matched is not None:
+                # Echo the client's validator, which carries the encoding suffix it was sent with
+                response = Response(status=304)
+                response.set_etag(matched)
+            else:
+                response = f(*args, **kwargs)
+                if isinstance(response, tuple) or getattr(response, 'status_code', None) != 200:
+                    return response
+                response.set_etag(etag)
+
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return decorated
+    return decorator
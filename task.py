@@ -2,12 +2,113 @@ from flask import Blueprint, request, jsonify
 from src.models.task import Task, DailyTaskSummary, db
 from src.models.marketplace import Marketplace
 from src.models.user import User
+from src.models.tombstone import Tombstone
+from src.models.task_event import TaskEvent
+from src.serializers import task_serializer, parse_fields
+from src.table_versions import conditional
+from src.response_cache import response_cache
+from src.event_broker import broker
+from src.query_budget import query_budget
+from src.idempotency import idempotent
+from src.task_archive import ARCHIVE_TABLE, archived_tasks, archived_task, archive_counts, needs_archive
+from src.overdue_sweeper import overdue_condition, flag_values
+from src.estimate_analytics import COMPLETIONS
+from src.routine_occurrences import LOOKBACK, virtual_task, virtual_tasks, due_virtual_tasks, materialize, enabled as virtual_routine_tasks
+from src import table_versions
+from src.versioning import version, expected_version, save_with_version, version_conflict, versioned_response
+from src.partial_update import TASK_PATCH_FIELDS, patch_values, patch_table, patch_row, patch_data, patch_failure
 from datetime import datetime, timedelta, date
+import json
 import uuid
+from sqlalchemy import select, union_all
 
 task_bp = Blueprint('task', __name__)
 
+def publish_task_event(event_type, task):
+    """Notify SSE clients of a committed task change with a compact payload"""
+    broker.publish(event_type, {
+        'id': task.id,
+        'status': task.status,
+        'marketplace': task.marketplace_id,
+        'dueDate': task.due_date.isoformat() if task.due_date else None
+    })
+
+def task_filters(t, search, status_filter, priority_filter, marketplace_filter, assignee_filter, date_filter, now):
+    """Listing conditions over `t` (the Task model or the archive table's columns) plus the due date range"""
+    conditions = []
+    
+    if search:
+        conditions.append(
+            db.or_(
+                t.title.ilike(f'%{search}%'),
+                t.description.ilike(f'%{search}%')
+            )
+        )
+    
+    if status_filter != 'all':
+        conditions.append(t.status == status_filter)
+    
+    if priority_filter != 'all':
+        conditions.append(t.priority == priority_filter)
+    
+    if marketplace_filter != 'all':
+        conditions.append(t.marketplace_id == marketplace_filter)
+    
+    if assignee_filter != 'all':
+        conditions.append(t.assignee_id == assignee_filter)
+    
+    # Date filters
+    due_from = due_to = None
+    if date_filter == 'today':
+        due_from = datetime.combine(now.date(), datetime.min.time())
+        due_to = datetime.combine(now.date(), datetime.max.time())
+        conditions.append(t.due_date.between(due_from, due_to))
+    elif date_filter == 'week':
+        due_from = now - timedelta(days=now.weekday())
+        due_to = due_from + timedelta(days=6)
+        conditions.append(t.due_date.between(due_from, due_to))
+    elif date_filter == 'month':
+        due_from = now.replace(day=1)
+        due_to = due_from.replace(month=due_from.month + 1) if due_from.month < 12 else due_from.replace(year=due_from.year + 1, month=1)
+        conditions.append(t.due_date.between(due_from, due_to))
+    elif date_filter == 'overdue':
+        due_to = now
+        # Archived tasks are all completed, so the status test alone excludes them
+        conditions.append(overdue_condition(now) if t is Task else t.status != 'completed')
+    
+    return conditions, due_from, due_to
+
+def listed_virtual_tasks(search, status_filter, priority_filter, marketplace_filter, assignee_filter, due_from, due_to, now):
+    """Virtual routine tasks matching a listing's filters; without a date range, those already due to run"""
+    # Virtual tasks are always unassigned todo tasks
+    if not virtual_routine_tasks() or status_filter not in ('all', 'todo') or assignee_filter != 'all':
+        return []
+    
+    marketplace = None if marketplace_filter == 'all' else marketplace_filter
+    if due_to is None:
+        tasks = due_virtual_tasks(marketplace=marketplace, now=now)
+    else:
+        tasks = virtual_tasks(due_from or now - LOOKBACK, due_to, marketplace=marketplace, now=now)
+    
+    if priority_filter != 'all':
+        tasks = [task for task in tasks if task['priority'] == priority_filter]
+    if search:
+        needle = search.lower()
+        tasks = [
+            task for task in tasks
+            if needle in task['title'].lower() or needle in (task['description'] or '').lower()
+        ]
+    return tasks
+
+def due_date_key(value):
+    """Sort key for serialized due dates (datetimes from rows, ISO strings from virtual tasks), nulls first"""
+    if value is None:
+        return (False, '')
+    return (True, value if isinstance(value, str) else value.isoformat())
+
 @task_bp.route('/tasks', methods=['GET'])
+@conditional('tasks', ARCHIVE_TABLE, 'routines', 'routine_tasks', 'tombstones', bucket=60)
+@query_budget(5)  # one for the archive horizon when not cached, two for virtual routine tasks when enabled
 def get_tasks():
     """Get all tasks with optional filtering"""
     try:
@@ -18,55 +119,52 @@ def get_tasks():
         marketplace_filter = request.args.get('marketplace', 'all')
         assignee_filter = request.args.get('assignee', 'all')
         date_filter = request.args.get('date', 'all')  # today, week, month, overdue
+        include_archived = request.args.get('includeArchived', 'false').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'))
         
-        # Build query
-        query = Task.query
-        
-        # Apply filters
-        if search:
-            query = query.filter(
-                db.or_(
-                    Task.title.ilike(f'%{search}%'),
-                    Task.description.ilike(f'%{search}%')
-                )
-            )
-        
-        if status_filter != 'all':
-            query = query.filter(Task.status == status_filter)
-        
-        if priority_filter != 'all':
-            query = query.filter(Task.priority == priority_filter)
-        
-        if marketplace_filter != 'all':
-            query = query.filter(Task.marketplace_id == marketplace_filter)
-        
-        if assignee_filter != 'all':
-            query = query.filter(Task.assignee_id == assignee_filter)
+        invalid_fields = task_serializer.unknown_fields(fields)
+        if invalid_fields:
+            return jsonify({
+                'success': False,
+                'error': f'Campos inválidos: {", ".join(invalid_fields)}'
+            }), 400
         
-        # Date filters
         now = datetime.utcnow()
-        if date_filter == 'today':
-            today_start = datetime.combine(now.date(), datetime.min.time())
-            today_end = datetime.combine(now.date(), datetime.max.time())
-            query = query.filter(Task.due_date.between(today_start, today_end))
-        elif date_filter == 'week':
-            week_start = now - timedelta(days=now.weekday())
-            week_end = week_start + timedelta(days=6)
-            query = query.filter(Task.due_date.between(week_start, week_end))
-        elif date_filter == 'month':
-            month_start = now.replace(day=1)
-            next_month = month_start.replace(month=month_start.month + 1) if month_start.month < 12 else month_start.replace(year=month_start.year + 1, month=1)
-            query = query.filter(Task.due_date.between(month_start, next_month))
-        elif date_filter == 'overdue':
-            query = query.filter(Task.due_date < now, Task.status != 'completed')
-        
-        # Execute query
-        tasks = query.order_by(Task.due_date.asc()).all()
+        filters = (search, status_filter, priority_filter, marketplace_filter, assignee_filter, date_filter, now)
+        conditions, due_from, due_to = task_filters(Task, *filters)
+        columns = task_serializer.columns(fields)
+        
+        if needs_archive(status_filter, due_from, include_archived):
+            # One UNION ALL over the hot and archived tables, sorted by due date
+            archive_conditions, _, _ = task_filters(archived_tasks.c, *filters)
+            combined = union_all(
+                select(*columns, Task.due_date.label('sort_due_date')).where(*conditions),
+                select(
+                    *[archived_tasks.c[column.key] for column in columns],
+                    archived_tasks.c.due_date.label('sort_due_date')
+                ).where(*archive_conditions)
+            ).subquery()
+            rows = db.session.execute(
+                select(*combined.c).order_by(combined.c.sort_due_date.asc())
+            ).all()
+        else:
+            # Execute query (plain column rows, serialized without hydrating entities)
+            rows = Task.query.with_entities(*columns).filter(*conditions).order_by(Task.due_date.asc()).all()
+        
+        data = task_serializer.serialize(rows, fields)
+        virtual = listed_virtual_tasks(
+            search, status_filter, priority_filter, marketplace_filter, assignee_filter, due_from, due_to, now
+        )
+        if virtual:
+            keys = [key for key in task_serializer.keys if fields is None or key in fields]
+            data.extend(dict({key: task[key] for key in keys}, virtual=True) for task in virtual)
+            if 'dueDate' in keys:
+                data.sort(key=lambda task: due_date_key(task['dueDate']))
         
         return jsonify({
             'success': True,
-            'data': [task.to_dict() for task in tasks],
-            'total': len(tasks)
+            'data': data,
+            'total': len(data)
         })
     
     except Exception as e:
@@ -76,6 +174,7 @@ def get_tasks():
         }), 500
 
 @task_bp.route('/tasks', methods=['POST'])
+@idempotent
 def create_task():
     """Create a new task"""
     try:
@@ -118,7 +217,14 @@ def create_task():
         # Create task
         task = Task.create_from_dict(data)
         db.session.add(task)
+        TaskEvent.record(task.id, TaskEvent.CREATED)
+        if task.due_date is not None and task.due_date < datetime.utcnow() and task.status != 'completed':
+            # Created already overdue; flag it now rather than at the next sweep
+            db.session.flush()
+            t = patch_table(Task)
+            db.session.execute(t.update().where(t.c.id == task.id).values(flag_values(t, {}, datetime.utcnow())))
         db.session.commit()
+        publish_task_event('task.created', task)
         
         return jsonify({
             'success': True,
@@ -137,17 +243,30 @@ def create_task():
 def get_task(task_id):
     """Get a specific task"""
     try:
-        task = Task.query.get(task_id)
-        if not task:
+        row = db.session.query(Task, version).filter(Task.id == task_id).first()
+        if not row:
+            virtual = virtual_task(task_id)
+            if virtual is not None:
+                return jsonify({
+                    'success': True,
+                    'data': virtual
+                })
+            archived = archived_task(task_serializer.columns(), task_id)
+            if archived is not None:
+                return jsonify({
+                    'success': True,
+                    'data': dict(task_serializer.serialize([archived])[0], archived=True)
+                })
             return jsonify({
                 'success': False,
                 'error': 'Tarefa não encontrada'
             }), 404
         
-        return jsonify({
+        task, current_version = row
+        return versioned_response({
             'success': True,
             'data': task.to_dict()
-        })
+        }, current_version)
     
     except Exception as e:
         return jsonify({
@@ -159,6 +278,7 @@ def get_task(task_id):
 def update_task(task_id):
     """Update a task"""
     try:
+        materialize(task_id)
         task = Task.query.get(task_id)
         if not task:
             return jsonify({
@@ -167,14 +287,38 @@ def update_task(task_id):
             }), 404
         
         data = request.get_json()
+        try:
+            expected = expected_version(data)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
+        
+        # A status change runs its transition (state machine, event log), as in PATCH
+        if 'status' in data and data['status'] != task.status:
+            action = STATUS_ACTIONS.get(data['status'])
+            if action is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Status inválido'
+                }), 400
+            try:
+                values = patch_values(TASK_PATCH_FIELDS, {
+                    key: value for key, value in data.items() if key in TASK_PATCH_FIELDS and key != 'status'
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            return transition_task(task_id, action, 'Tarefa atualizada com sucesso', values, expected)
         
         # Update fields
         if 'title' in data:
             task.title = data['title']
         if 'description' in data:
             task.description = data['description']
-        if 'status' in data:
-            task.status = data['status']
         if 'priority' in data:
             task.priority = data['priority']
         if 'category' in data:
@@ -193,13 +337,22 @@ def update_task(task_id):
             task.notes = data['notes']
         
         task.updated_at = datetime.utcnow()
+        flags = None
+        if 'status' in data or 'dueDate' in data:
+            flags = flag_values(patch_table(Task), {'status': task.status, 'due_date': task.due_date}, task.updated_at)
+        new_version = save_with_version(task, expected, flags)
+        if new_version is None:
+            # Built before the rollback, which also drops a row materialize just added
+            conflict = version_conflict(Task, task_id)
+            db.session.rollback()
+            return conflict
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
             'data': task.to_dict(),
             'message': 'Tarefa atualizada com sucesso'
-        })
+        }, new_version)
     
     except Exception as e:
         db.session.rollback()
@@ -214,13 +367,25 @@ def delete_task(task_id):
     try:
         task = Task.query.get(task_id)
         if not task:
+            if virtual_task(task_id) is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Tarefa não encontrada'
+                }), 404
+            # Dismissing a virtual routine occurrence only needs the tombstone that hides it
+            Tombstone.record('tasks', task_id)
+            db.session.commit()
+            broker.publish('task.deleted', {'id': task_id})
             return jsonify({
-                'success': False,
-                'error': 'Tarefa não encontrada'
-            }), 404
+                'success': True,
+                'message': 'Tarefa excluída com sucesso'
+            })
         
         db.session.delete(task)
+        Tombstone.record('tasks', task_id)
+        TaskEvent.record(task_id, TaskEvent.DELETED)
         db.session.commit()
+        broker.publish('task.deleted', {'id': task_id})
         
         return jsonify({
             'success': True,
@@ -234,25 +399,125 @@ def delete_task(task_id):
             'error': str(e)
         }), 500
 
-@task_bp.route('/tasks/<task_id>/start', methods=['POST'])
-def start_task(task_id):
-    """Start a task"""
+# Lifecycle state machine: action -> (statuses it may start from, target status, logged event)
+TASK_TRANSITIONS = {
+    'start': (('todo',), 'in-progress', TaskEvent.STARTED),
+    'pause': (('in-progress',), 'todo', TaskEvent.PAUSED),
+    'complete': (('todo', 'in-progress'), 'completed', TaskEvent.COMPLETED),
+}
+
+TRANSITION_VERBS = {'start': 'iniciar', 'pause': 'pausar', 'complete': 'concluir'}
+TRANSITION_EVENTS = {'start': 'task.started', 'pause': 'task.paused', 'complete': 'task.completed'}
+
+# A PATCH that sets `status` runs the transition leading to it
+STATUS_ACTIONS = {target: action for action, (_sources, target, _event) in TASK_TRANSITIONS.items()}
+
+def transition_task(task_id, action, message, values=None, expected=None):
+    """Apply a lifecycle transition with one conditional UPDATE ... RETURNING.
+    
+    The WHERE clause carries the allowed source statuses, so of two
+    concurrent requests only one can win; the other gets a 409. Other
+    PATCH `values` are written by the same statement.
+    """
+    sources, target, event_type = TASK_TRANSITIONS[action]
+    now = datetime.utcnow()
+    values = dict(values or {}, status=target)
+    if action == 'start':
+        values['started_at'] = now
+    elif action == 'complete':
+        values['completed_at'] = now
+    
+    materialize(task_id, now)
+    t = patch_table(Task)
+    values.update(flag_values(t, values, now))
+    row = patch_row(Task, task_serializer, task_id, values, expected, [t.c.status.in_(sources)])
+    if row is None:
+        # Read before the rollback, which also drops a row materialize just added
+        failure = patch_failure(Task, task_id, expected, 'Tarefa não encontrada')
+        status = db.session.query(Task.status).filter(Task.id == task_id).scalar()
+        db.session.rollback()
+        if failure is not None:
+            return failure
+        return jsonify({
+            'success': False,
+            'error': f'Não é possível {TRANSITION_VERBS[action]} uma tarefa com status {status}'
+        }), 409
+    
+    TaskEvent.record(task_id, event_type)
+    db.session.commit()
+    if action == 'complete':
+        table_versions.bump(COMPLETIONS)
+    publish_task_event(TRANSITION_EVENTS[action], row)
+    
+    return versioned_response({
+        'success': True,
+        'data': patch_data(task_serializer, row),
+        'message': message
+    }, row.version)
+
+@task_bp.route('/tasks/<task_id>', methods=['PATCH'])
+def patch_task(task_id):
+    """Update only the given task fields with a single UPDATE"""
     try:
-        task = Task.query.get(task_id)
-        if not task:
+        data = request.get_json(silent=True)
+        try:
+            expected = expected_version(data if isinstance(data, dict) else None)
+        except ValueError:
             return jsonify({
                 'success': False,
-                'error': 'Tarefa não encontrada'
-            }), 404
+                'error': 'Versão inválida'
+            }), 400
+        try:
+            values = patch_values(TASK_PATCH_FIELDS, data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
-        task.start_task()
+        if not values:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum campo para atualizar'
+            }), 400
+        
+        if 'status' in values:
+            action = STATUS_ACTIONS.get(values.pop('status'))
+            if action is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Status inválido'
+                }), 400
+            return transition_task(task_id, action, 'Tarefa atualizada com sucesso', values, expected)
+        
+        materialize(task_id)
+        if 'due_date' in values:
+            values.update(flag_values(patch_table(Task), values, datetime.utcnow()))
+        row = patch_row(Task, task_serializer, task_id, values, expected)
+        if row is None:
+            failure = patch_failure(Task, task_id, expected, 'Tarefa não encontrada')
+            db.session.rollback()
+            return failure
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
-            'data': task.to_dict(),
-            'message': 'Tarefa iniciada'
-        })
+            'data': patch_data(task_serializer, row),
+            'message': 'Tarefa atualizada com sucesso'
+        }, row.version)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@task_bp.route('/tasks/<task_id>/start', methods=['POST'])
+def start_task(task_id):
+    """Start a task"""
+    try:
+        return transition_task(task_id, 'start', 'Tarefa iniciada')
     
     except Exception as e:
         db.session.rollback()
@@ -265,21 +530,7 @@ def start_task(task_id):
 def complete_task(task_id):
     """Complete a task"""
     try:
-        task = Task.query.get(task_id)
-        if not task:
-            return jsonify({
-                'success': False,
-                'error': 'Tarefa não encontrada'
-            }), 404
-        
-        task.complete_task()
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'data': task.to_dict(),
-            'message': 'Tarefa concluída'
-        })
+        return transition_task(task_id, 'complete', 'Tarefa concluída')
     
     except Exception as e:
         db.session.rollback()
@@ -292,21 +543,7 @@ def complete_task(task_id):
 def pause_task(task_id):
     """Pause a task"""
     try:
-        task = Task.query.get(task_id)
-        if not task:
-            return jsonify({
-                'success': False,
-                'error': 'Tarefa não encontrada'
-            }), 404
-        
-        task.pause_task()
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'data': task.to_dict(),
-            'message': 'Tarefa pausada'
-        })
+        return transition_task(task_id, 'pause', 'Tarefa pausada')
     
     except Exception as e:
         db.session.rollback()
@@ -316,15 +553,19 @@ def pause_task(task_id):
         }), 500
 
 @task_bp.route('/tasks/daily', methods=['GET'])
+@conditional('tasks', 'routines', 'routine_tasks', 'tombstones', bucket=60)
+@response_cache.cached('tasks', 'routines', 'routine_tasks', 'tombstones', ttl=60)
+@query_budget(3)
 def get_daily_tasks():
     """Get today's tasks organized by status"""
     try:
-        today = datetime.utcnow().date()
+        now = datetime.utcnow()
+        today = now.date()
         today_start = datetime.combine(today, datetime.min.time())
         today_end = datetime.combine(today, datetime.max.time())
         
-        # Get today's tasks
-        tasks = Task.query.filter(
+        # Get today's tasks with whether each is overdue
+        rows = db.session.query(Task, overdue_condition(now)).filter(
             Task.due_date.between(today_start, today_end)
         ).order_by(Task.due_date.asc()).all()
         
@@ -336,18 +577,27 @@ def get_daily_tasks():
             'overdue': []
         }
         
-        for task in tasks:
+        for task, is_overdue in rows:
             if task.status == 'completed':
                 organized_tasks['completed'].append(task.to_dict())
             elif task.status == 'in-progress':
                 organized_tasks['in_progress'].append(task.to_dict())
-            elif task.due_date < datetime.utcnow() and task.status != 'completed':
+            elif is_overdue:
                 organized_tasks['overdue'].append(task.to_dict())
             else:
                 organized_tasks['pending'].append(task.to_dict())
         
+        # Routine occurrences due today that no one has started yet
+        virtual = virtual_tasks(today_start, today_start + timedelta(days=1)) if virtual_routine_tasks() else []
+        if virtual:
+            for task in virtual:
+                bucket = 'overdue' if datetime.fromisoformat(task['dueDate']) < now else 'pending'
+                organized_tasks[bucket].append(task)
+            organized_tasks['pending'].sort(key=lambda task: task['dueDate'] or '')
+            organized_tasks['overdue'].sort(key=lambda task: task['dueDate'] or '')
+        
         # Calculate progress
-        total_tasks = len(tasks)
+        total_tasks = len(rows) + len(virtual)
         completed_tasks = len(organized_tasks['completed'])
         progress = round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
         
@@ -380,21 +630,119 @@ def get_daily_tasks():
             'error': str(e)
         }), 500
 
+# Intervals that began up to this long before `from` are clipped to it instead of dropped
+TIME_IN_STATUS_LOOKBACK = timedelta(days=7)
+TIME_IN_STATUS_GROUPS = ('status', 'task', 'marketplace', 'assignee')
+
+@task_bp.route('/tasks/time-in-status', methods=['GET'])
+@conditional('task_events', bucket=60)
+@query_budget(1)
+def get_time_in_status():
+    """Seconds spent in each status, from the task event log, for a time window"""
+    try:
+        group_by = request.args.get('groupBy', 'status')
+        if group_by not in TIME_IN_STATUS_GROUPS:
+            return jsonify({
+                'success': False,
+                'error': f'groupBy inválido (use {", ".join(TIME_IN_STATUS_GROUPS)})'
+            }), 400
+        
+        now = datetime.utcnow()
+        try:
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from') else now - timedelta(days=7)
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('to') else now
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Datas devem estar no formato AAAA-MM-DD'
+            }), 400
+        end = min(end, now)
+        
+        epoch = datetime(1970, 1, 1)
+        start_ms = int((start - epoch).total_seconds() * 1000)
+        end_ms = int((end - epoch).total_seconds() * 1000)
+        scan_from_ms = int((start - TIME_IN_STATUS_LOOKBACK - epoch).total_seconds() * 1000)
+        
+        # One indexed range read over ts; each event's interval runs until the task's next event
+        events = TaskEvent.__table__
+        intervals = select(
+            events.c.task_id,
+            events.c.event_type,
+            events.c.ts,
+            db.func.lead(events.c.ts).over(partition_by=events.c.task_id, order_by=events.c.ts).label('next_ts')
+        ).where(events.c.ts >= scan_from_ms, events.c.ts < end_ms).subquery()
+        
+        interval_start = db.case((intervals.c.ts < start_ms, start_ms), else_=intervals.c.ts)
+        interval_end = db.func.coalesce(intervals.c.next_ts, end_ms)
+        duration = db.func.sum(interval_end - interval_start)
+        
+        keys = [intervals.c.event_type]
+        query = select(intervals.c.event_type, duration, db.func.count())
+        if group_by == 'task':
+            keys.append(intervals.c.task_id)
+        elif group_by in ('marketplace', 'assignee'):
+            column = Task.marketplace_id if group_by == 'marketplace' else Task.assignee_id
+            keys.append(column)
+            query = query.join_from(intervals, Task, Task.id == intervals.c.task_id)
+        if len(keys) > 1:
+            query = query.add_columns(keys[1])
+        
+        rows = db.session.execute(
+            query.where(
+                intervals.c.event_type.in_(list(TaskEvent.STATUS_AFTER)),
+                interval_end > interval_start
+            ).group_by(*keys)
+        ).all()
+        
+        totals = {}
+        groups = {}
+        for row in rows:
+            status = TaskEvent.STATUS_AFTER[row[0]]
+            seconds = round(row[1] / 1000.0, 1)
+            totals[status] = round(totals.get(status, 0) + seconds, 1)
+            if group_by != 'status':
+                group = groups.setdefault(row[3], {'key': row[3], 'seconds': {}, 'intervals': 0})
+                group['seconds'][status] = seconds
+                group['intervals'] += row[2]
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'groupBy': group_by,
+                'seconds': totals,
+                'groups': list(groups.values()) if group_by != 'status' else None
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @task_bp.route('/tasks/stats', methods=['GET'])
+@conditional('tasks', ARCHIVE_TABLE, 'routines', 'routine_tasks', 'tombstones', bucket=60)
+@response_cache.cached('tasks', ARCHIVE_TABLE, 'routines', 'routine_tasks', 'tombstones', ttl=60)
+@query_budget(8)  # one for the archive counts when not cached, two for virtual routine tasks when enabled
 def get_task_stats():
     """Get task statistics"""
     try:
         # Overall stats
+        now = datetime.utcnow()
         total_tasks = Task.query.count()
         pending_tasks = Task.query.filter(Task.status.in_(['todo', 'in-progress'])).count()
         completed_tasks = Task.query.filter(Task.status == 'completed').count()
-        overdue_tasks = Task.query.filter(
-            Task.due_date < datetime.utcnow(),
-            Task.status != 'completed'
-        ).count()
+        overdue_tasks = Task.query.filter(overdue_condition(now)).count()
+        
+        # Archived tasks are all completed (and long past due)
+        archived = archive_counts()[0]
+        total_tasks += archived
+        completed_tasks += archived
         
         # Today's stats
-        today = datetime.utcnow().date()
+        today = now.date()
         today_start = datetime.combine(today, datetime.min.time())
         today_end = datetime.combine(today, datetime.max.time())
         
@@ -402,6 +750,15 @@ def get_task_stats():
             Task.due_date.between(today_start, today_end)
         ).count()
         
+        # Routine occurrences that would already be rows without virtual mode
+        if virtual_routine_tasks():
+            for task in due_virtual_tasks(now=now):
+                due_date = datetime.fromisoformat(task['dueDate'])
+                total_tasks += 1
+                pending_tasks += 1
+                overdue_tasks += due_date < now
+                today_tasks += today_start <= due_date <= today_end
+        
         # Performance stats
         completion_rate = round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
         
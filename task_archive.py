@@ -0,0 +1,173 @@
+"""Move old completed tasks out of the hot `tasks` table into `tasks_archive`.
+
+Usage: python -m src.task_archive --database app.db [--days 90] [--batch-size 5000]
+
+A task is archived once it is completed and both its completion and due
+dates are older than the configured age, so any due-date range that starts
+after the archive horizon can be answered from `tasks` alone.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, MetaData, Table, bindparam, inspect, select, text
+
+from src.models.task import Task, db
+from src import table_versions
+
+ARCHIVE_TABLE = 'tasks_archive'
+ARCHIVE_AFTER_DAYS = 90
+BATCH_SIZE = 5000
+
+# Re-read the archive horizon and counts at least this often, in case another
+# process archived without a shared table-version store
+HORIZON_TTL = 300
+
+# Same columns as the model's table, for reads that union both tables
+archived_tasks = Table(
+    ARCHIVE_TABLE, MetaData(),
+    *[Column(column.name, column.type) for column in Task.__table__.columns]
+)
+
+# name -> (archive version, read at, value) for the cached archive reads
+_cache = {}
+
+
+def ensure_archive_table(db):
+    """Create tasks_archive with the live table's columns, adding any it lacks"""
+    with db.engine.begin() as conn:
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} AS SELECT * FROM tasks WHERE 1 = 0'))
+
+        inspector = inspect(conn)
+        archived = {column['name'] for column in inspector.get_columns(ARCHIVE_TABLE)}
+        for column in inspector.get_columns('tasks'):
+            if column['name'] not in archived:
+                column_type = column['type'].compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN {column["name"]} {column_type}'))
+
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{ARCHIVE_TABLE}_due_date ON {ARCHIVE_TABLE} (due_date)'))
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{ARCHIVE_TABLE}_id ON {ARCHIVE_TABLE} (id)'))
+
+
+def archive_completed_tasks(after_days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, now=None):
+    """Move eligible completed tasks in batches, one transaction per batch; returns the count"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=after_days)
+    tasks = Task.__table__
+    column_names = ', '.join(column['name'] for column in inspect(db.engine).get_columns('tasks'))
+
+    eligible = select(tasks.c.id).where(
+        tasks.c.status == 'completed',
+        tasks.c.completed_at < cutoff,
+        db.or_(tasks.c.due_date.is_(None), tasks.c.due_date < cutoff)
+    ).limit(batch_size)
+    copy = text(
+        f'INSERT INTO {ARCHIVE_TABLE} ({column_names}) SELECT {column_names} FROM tasks WHERE id IN :ids'
+    ).bindparams(bindparam('ids', expanding=True))
+    remove = tasks.delete().where(tasks.c.id.in_(bindparam('ids', expanding=True)))
+
+    moved = 0
+    while True:
+        ids = db.session.execute(eligible).scalars().all()
+        if not ids:
+            break
+        try:
+            db.session.execute(copy, {'ids': ids})
+            db.session.execute(remove, {'ids': ids})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # Core statements bypass the session's write tracking
+        table_versions.bump('tasks', ARCHIVE_TABLE)
+        moved += len(ids)
+    return moved
+
+
+def _cached(name, read):
+    """read(), cached per archive version so listings and stats only repeat it after an archive run"""
+    version = table_versions.current(ARCHIVE_TABLE)
+    entry = _cache.get(name)
+    if entry is not None and entry[0] == version and time.time() - entry[1] < HORIZON_TTL:
+        return entry[2]
+
+    value = read()
+    _cache[name] = (version, time.time(), value)
+    return value
+
+
+def _read_horizon():
+    value = db.session.execute(select(db.func.max(archived_tasks.c.due_date))).scalar()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value
+
+
+def archive_horizon():
+    """Latest due date held in the archive (None when empty), cached per archive version"""
+    return _cached('horizon', _read_horizon)
+
+
+def _read_counts():
+    total, routine_tasks = db.session.execute(
+        select(db.func.count(), db.func.count(archived_tasks.c.routine_id))
+    ).one()
+    return total, routine_tasks
+
+
+def archive_counts():
+    """(archived tasks, archived routine tasks), cached per archive version; all of them are completed"""
+    return _cached('counts', _read_counts)
+
+
+def archived_task(columns, task_id):
+    """Row of an archived task with the given Task columns (matched by key), or None"""
+    return db.session.execute(
+        select(*[archived_tasks.c[column.key] for column in columns]).where(archived_tasks.c.id == task_id)
+    ).first()
+
+
+def needs_archive(status_filter, due_from, include_archived):
+    """Whether a task listing must also read the archive.
+
+    The archive only holds completed tasks, so other status filters never
+    need it; otherwise it is read when asked for explicitly or when the
+    due-date range starts at or before the newest archived due date.
+    """
+    if status_filter not in ('all', 'completed'):
+        return False
+    if include_archived:
+        return True
+    if due_from is None:
+        return False
+    horizon = archive_horizon()
+    return horizon is not None and due_from <= horizon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file path or SQLAlchemy URI')
+    parser.add_argument('--days', type=int, default=int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)),
+                        help='Archive tasks completed and due more than this many days ago')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from src.seed import build_app
+
+    # Invalidate the running workers' ETags and cached responses too
+    shared_path = os.environ.get('RESPONSE_CACHE_SHARED_PATH')
+    if shared_path:
+        from src.shared_store import SharedStore
+        table_versions.use_shared_store(SharedStore(shared_path))
+
+    app = build_app(args.database)
+    with app.app_context():
+        ensure_archive_table(db)
+        start = time.perf_counter()
+        moved = archive_completed_tasks(args.days, args.batch_size)
+    print(json.dumps({'archived': moved, 'seconds': round(time.perf_counter() - start, 3)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import time
+from src.models.user import db
+
+class TaskEvent(db.Model):
+    """Append-only log of task lifecycle transitions (rows are never updated or deleted)"""
+    __tablename__ = 'task_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.String(36), nullable=False)
+    event_type = db.Column(db.SmallInteger, nullable=False)
+    ts = db.Column(db.BigInteger, nullable=False, index=True)  # epoch milliseconds
+
+    __table_args__ = (
+        db.Index('ix_task_events_task_id_ts', 'task_id', 'ts'),
+    )
+
+    CREATED = 1
+    STARTED = 2
+    PAUSED = 3
+    COMPLETED = 4
+    DELETED = 5
+
+    # Status a task is in from each event until its next one (terminal events have none)
+    STATUS_AFTER = {
+        CREATED: 'todo',
+        STARTED: 'in-progress',
+        PAUSED: 'todo',  # pausing puts the task back to todo
+    }
+
+    @staticmethod
+    def now():
+        return int(time.time() * 1000)
+
+    @classmethod
+    def record(cls, task_id, event_type):
+        """Add an event to the current session (committed with the transition itself)"""
+        event = cls(task_id=task_id, event_type=event_type, ts=cls.now())
+        db.session.add(event)
+        return event
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from src.models.user import db
+
+class Tombstone(db.Model):
+    """Marker left behind by a hard delete so delta sync clients can drop the row"""
+    __tablename__ = 'tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # tasks, routines, marketplaces
+    entity_id = db.Column(db.String(100), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    # Tombstones older than this are pruned; clients syncing from before it get a full snapshot
+    RETENTION_DAYS = 30
+    
+    @classmethod
+    def record(cls, entity, entity_id):
+        """Add a tombstone to the current session (committed with the delete itself)"""
+        cls.prune(datetime.utcnow() - timedelta(days=cls.RETENTION_DAYS))
+        tombstone = cls(entity=entity, entity_id=str(entity_id), deleted_at=datetime.utcnow())
+        db.session.add(tombstone)
+        return tombstone
+    
+    @classmethod
+    def prune(cls, before):
+        """Delete tombstones recorded before the given datetime"""
+        return cls.query.filter(cls.deleted_at < before).delete(synchronize_session=False)
+    
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'id': self.entity_id,
+            'deletedAt': self.deleted_at.isoformat() if self.deleted_at else None
+        }
@@ -1,6 +1,9 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, g
 from src.models.user import User, db
+from src.serializers import user_serializer, parse_fields
+from src.versioning import version, expected_version, save_with_version, version_conflict, versioned_response
 from functools import wraps
+from datetime import datetime
 import jwt
 import os
 
@@ -23,8 +26,13 @@ def token_required(f):
             if token.startswith('Bearer '):
                 token = token[7:]
             
-            # Verify token
-            user = User.verify_token(token)
+            # Verify token once per app context; batched sub-requests share only the
+            # verified user id and load the user into their own session
+            if g.get('auth_token') == token:
+                user = User.query.get(g.auth_user_id) if g.auth_user_id else None
+            else:
+                user = User.verify_token(token)
+                g.auth_token, g.auth_user_id = token, user.id if user else None
             if not user:
                 return jsonify({
                     'success': False,
@@ -199,6 +207,23 @@ def get_users():
                 'error': 'Acesso negado'
             }), 403
         
+        fields = parse_fields(request.args.get('fields'))
+        
+        # Sparse fieldsets: select only the requested columns as plain rows
+        if fields:
+            invalid_fields = user_serializer.unknown_fields(fields)
+            if invalid_fields:
+                return jsonify({
+                    'success': False,
+                    'error': f'Campos inválidos: {", ".join(invalid_fields)}'
+                }), 400
+            
+            rows = User.query.with_entities(*user_serializer.columns(fields)).all()
+            return jsonify({
+                'success': True,
+                'data': user_serializer.serialize(rows, fields)
+            })
+        
         users = User.query.all()
         return jsonify({
             'success': True,
@@ -278,17 +303,18 @@ def get_user(user_id):
                 'error': 'Acesso negado'
             }), 403
         
-        user = User.query.get(user_id)
-        if not user:
+        row = db.session.query(User, version).filter(User.id == user_id).first()
+        if not row:
             return jsonify({
                 'success': False,
                 'error': 'Usuário não encontrado'
             }), 404
         
-        return jsonify({
+        user, current_version = row
+        return versioned_response({
             'success': True,
             'data': user.to_dict()
-        })
+        }, current_version)
     
     except Exception as e:
         return jsonify({
@@ -316,6 +342,13 @@ def update_user(user_id):
             }), 404
         
         data = request.get_json()
+        try:
+            expected = expected_version(data)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Versão inválida'
+            }), 400
         
         # Update fields
         if 'username' in data:
@@ -359,13 +392,17 @@ def update_user(user_id):
             user.set_password(data['password'])
         
         user.updated_at = datetime.utcnow()
+        new_version = save_with_version(user, expected)
+        if new_version is None:
+            db.session.rollback()
+            return version_conflict(User, user_id)
         db.session.commit()
         
-        return jsonify({
+        return versioned_response({
             'success': True,
             'data': user.to_dict(),
             'message': 'Usuário atualizado com sucesso'
-        })
+        }, new_version)
     
     except Exception as e:
         db.session.rollback()
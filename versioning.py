@@ -0,0 +1,99 @@
+from flask import jsonify, request
+from sqlalchemy import Column, Integer, MetaData, Table, column, inspect
+
+from src.models.user import db
+from src.compression import base_etag
+
+# Row version counter added by src.schema to every editable table (the models
+# do not declare it). Bumped by each write that goes through save_with_version.
+version = column('version', Integer)
+
+_metadata = MetaData()
+
+
+def versioned_table(table):
+    """Copy of a model's table that also has the version column, for Core UPDATEs"""
+    if table.name not in _metadata.tables:
+        Table(
+            table.name, _metadata,
+            *[Column(c.name, c.type, primary_key=c.primary_key) for c in table.columns],
+            Column('version', Integer, nullable=False)
+        )
+    return _metadata.tables[table.name]
+
+
+def expected_version(data=None):
+    """Version the client edited, from If-Match or the body's `version` (None when not given).
+
+    Raises ValueError when the value is not an integer.
+    """
+    if request.if_match and not request.if_match.star_tag:
+        tags = request.if_match.as_set(include_weak=True)
+        if tags:
+            return int(base_etag(next(iter(tags))))
+    if data and data.get('version') is not None:
+        return int(data['version'])
+    return None
+
+
+def pending_changes(obj):
+    """Column values assigned on a loaded entity and not yet flushed, keyed by column name"""
+    state = inspect(obj)
+    changes = {}
+    for prop in state.mapper.column_attrs:
+        history = state.attrs[prop.key].history
+        if history.added:
+            changes[prop.columns[0].name] = history.added[0]
+    return changes
+
+
+def save_with_version(obj, expected=None, values=None):
+    """Write obj's pending changes in one compare-and-swap UPDATE.
+
+    The UPDATE only matches while the row is still at `expected` (any
+    version when None) and bumps the counter. `values` adds columns the
+    model does not map (expressions over versioned_table allowed). Returns
+    the new version, or None on a conflict, in which case the caller must
+    roll back.
+    """
+    table = versioned_table(obj.__table__)
+    mapper = inspect(obj).mapper
+    primary_key = mapper.primary_key[0]
+    identity = mapper.primary_key_from_instance(obj)[0]
+
+    changes = pending_changes(obj)
+    # The UPDATE below writes these; drop them from the unit of work so commit does not repeat them
+    db.session.expire(obj, [prop.key for prop in mapper.column_attrs if prop.columns[0].name in changes])
+
+    statement = table.update().where(table.c[primary_key.name] == identity)
+    if expected is not None:
+        statement = statement.where(table.c.version == expected)
+    statement = statement.values(**changes, **(values or {}), version=table.c.version + 1)
+    if db.engine.dialect.update_returning:
+        row = db.session.execute(statement.returning(table.c.version)).first()
+        return row[0] if row is not None else None
+
+    if not db.session.execute(statement).rowcount:
+        return None
+    return db.session.execute(
+        table.select().with_only_columns(table.c.version).where(table.c[primary_key.name] == identity)
+    ).scalar()
+
+
+def version_conflict(model, entity_id):
+    """412 response carrying the row's current version"""
+    primary_key = inspect(model).primary_key[0]
+    current = db.session.query(version).select_from(model).filter(primary_key == entity_id).scalar()
+    return jsonify({
+        'success': False,
+        'error': 'Conflito de versão: o registro foi alterado por outra pessoa. Recarregue e tente novamente.',
+        'currentVersion': current
+    }), 412
+
+
+def versioned_response(payload, current_version):
+    """jsonify(payload) with the entity's version in data.version and the ETag"""
+    payload['data']['version'] = current_version
+    response = jsonify(payload)
+    response.set_etag(str(current_version))
+    return response